@@ -1,20 +1,22 @@
-import streamlit as st
-import pandas as pd
-import google.generativeai as genai
-import os
-import plotly.express as px
 import json
+from flight_stats import compute_flight_aggregates
+from insights_cache import insights_key, str_keys
         
-def prepare_data_summary(df):
+def prepare_data_summary(df, aggregates=None):
+    # Rollups come from the shared aggregation engine instead of being recomputed here
+    if aggregates is None:
+        aggregates = compute_flight_aggregates(df)
+    overall = aggregates['overall']
+
     summary = {
         "basic_stats": {
             "total_flights": len(df),
             "price_range": {
-                "min": df['Price_Numeric'].min(),
-                "max": df['Price_Numeric'].max(),
-                "average": df['Price_Numeric'].mean(),
-                "median": df['Price_Numeric'].median(),
-                "std_dev": df['Price_Numeric'].std()
+                "min": overall['min'],
+                "max": overall['max'],
+                "average": overall['mean'],
+                "median": overall['median'],
+                "std_dev": overall['std']
             },
             "date_range": {
                 "earliest_departure": df['Departure_Date'].min().strftime('%Y-%m-%d'),
@@ -23,31 +25,56 @@ def prepare_data_summary(df):
                 "latest_return": df['Return_Date'].max().strftime('%Y-%m-%d')
             }
         },
-        "departure_day_analysis": df.groupby('Departure_Day')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2).to_dict(),
-        "return_day_analysis": df.groupby('Return_Day')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2).to_dict(),
-        "duration_analysis": df.groupby('Trip_Duration')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2).to_dict(),
-        "price_category_analysis": df.groupby('Price_Category')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2).to_dict(),
-        "temporal_trends": df.sort_values('Departure_Date')[['Departure_Date', 'Price_Numeric', 'Trip_Duration']].to_dict('records')[:10],  # First 10 records for trend analysis
-        "weekend_vs_weekday": {
-            "weekend_avg": df[df['Departure_Day'].isin(['Saturday', 'Sunday'])]['Price_Numeric'].mean() if len(df[df['Departure_Day'].isin(['Saturday', 'Sunday'])]) > 0 else None,
-            "weekday_avg": df[~df['Departure_Day'].isin(['Saturday', 'Sunday'])]['Price_Numeric'].mean() if len(df[~df['Departure_Day'].isin(['Saturday', 'Sunday'])]) > 0 else None
-        }
+        "departure_day_analysis": aggregates['departure_day'].to_dict(),
+        "return_day_analysis": aggregates['return_day'].to_dict(),
+        # Durations are stored as Int16; JSON keys must be native ints
+        "duration_analysis": aggregates['duration'].set_axis(aggregates['duration'].index.astype('int64')).to_dict(),
+        "price_category_analysis": aggregates['category'].to_dict(),
+        "temporal_trends": df[['Departure_Date', 'Price_Numeric', 'Trip_Duration']].nsmallest(10, 'Departure_Date').to_dict('records'),  # First 10 records for trend analysis
+        "weekend_vs_weekday": aggregates['weekend_vs_weekday']
     }
     return summary
 
-def generate_gemini_insights(data_summary, api_key):
-    try:
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+
+# Insights clients: anything with a model_name and a generate(prompt) -> str method can be used
+class GeminiClient:
+    def __init__(self, api_key, model_name=DEFAULT_MODEL):
+        self.api_key = api_key
+        self.model_name = model_name
+
+    def generate(self, prompt):
+        # The Gemini SDK is slow to import, so it is only loaded when a prompt is actually sent
+        import google.generativeai as genai
+
         # Configure Gemini API
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        
-        # Create prompt for analysis
-        prompt = f"""
+        genai.configure(api_key=self.api_key)
+        model = genai.GenerativeModel(self.model_name)
+        response = model.generate_content(prompt)
+        return response.text
+
+
+# Local stand-in for tests and offline runs; records the prompts it was given
+class FakeInsightsClient:
+    def __init__(self, response="- Prices are stable across the selected dates.", model_name="fake-insights"):
+        self.response = response
+        self.model_name = model_name
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return self.response
+
+
+def build_insights_prompt(data_summary):
+    # Create prompt for analysis
+    return f"""
         Analyze the following flight price data and provide key insights about demand trends, price changes, and patterns. 
         Focus on actionable insights for travelers and provide a concise point-wise summary.
 
         Data Summary:
-        {json.dumps(data_summary, indent=2, default=str)}
+        {json.dumps(str_keys(data_summary), indent=2, default=str)}
 
         Please provide:
         1. Key demand trends (which days/durations are most popular)
@@ -59,10 +86,24 @@ def generate_gemini_insights(data_summary, api_key):
 
         Keep the response concise and point-wise. Focus only on the most relevant and actionable insights.
         """
-        
-        response = model.generate_content(prompt)
-        return response.text
-    
+
+
+def generate_gemini_insights(data_summary, api_key=None, client=None, cache=None):
+    client = client or GeminiClient(api_key)
+
+    try:
+        # Identical summaries for the same model are answered from the cache
+        key = insights_key(data_summary, client.model_name)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        insights = client.generate(build_insights_prompt(data_summary))
     except Exception as e:
+        # Errors are returned to the page but never cached
         return f"Error generating AI insights: {str(e)}"
 
+    if cache is not None:
+        cache.put(key, client.model_name, insights)
+    return insights
@@ -1,31 +1,45 @@
 # Import required modules
-from flask import Flask, request, jsonify
-from scrapper1 import data_scrapper
-from scrapper2 import airline_data
+from flask import Flask, Response, request, jsonify, stream_with_context
+from batch import BatchQueue, validate_searches
+from job_queue import UNKNOWN_WAITER, JobQueue
+from metrics import metrics
+from result_cache import ResultCache
+from warmup import BACKEND_MODULES, import_report, prewarm
+import json
+import os
+import threading
 
 # Initialize the Flask app
 app = Flask(__name__)
 
-# Define route for POST request at '/submit'
+# Searches run in the background on a bounded pool of workers; repeated searches are served from the result cache
+result_cache = ResultCache()
+job_queue = JobQueue(workers=int(os.environ.get("JOB_WORKERS", 2)), cache=result_cache)
+# Batches run in the background, one at a time, on at most MAX_BATCH_WORKERS browser processes
+batch_queue = BatchQueue()
+
+# Define route for POST request at '/submit' to queue a search and return its job id immediately
 @app.route('/submit', methods=['POST'])
 def submit_data():
     try:
         print("Request received")
 
-        # Parse incoming JSON data from the request
-        data = request.get_json()
+        # Parse incoming JSON data from the request; an empty or malformed body is a client error
+        data = request.get_json(silent=True)
         print("Data received:", data)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        search = validate_searches([data])[0]
 
-        # Call data_scrapper function with unpacked data dictionary
-        current_url = data_scrapper(**data)
-        print("Scraper finished:", current_url)
-
-        # Process the scraped data using airline_data function
-        airline_data(current_url)
-        print("Data processing done")
+        # Queue the scrape; its files are written to the job's own folder. '?refresh=1' skips the cache
+        job_id, waiter = job_queue.submit(search, use_cache=request.args.get("refresh") != "1")
+        job = job_queue.get(job_id)
+        print("Job queued:", job_id, "(from cache)" if job["from_cache"] else "", "(joined in-flight scrape)" if job["waiters"] > 1 else "")
 
-        # Return success response with the URL
-        return jsonify({"message": "Success", "url": current_url}), 200
+        return jsonify({"message": "Queued", "job_id": job_id, "waiter": waiter, "status": job["status"],
+                        "from_cache": job["from_cache"], "coalesced": job["waiters"] > 1}), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Print the full stack trace for debugging in case of an error
         import traceback; traceback.print_exc()
@@ -34,5 +48,180 @@ def submit_data():
         return jsonify({"error": str(e)}), 500
 
 
+# Function to stream a job's events as server-sent events until it finishes; comments keep idle connections open
+def stream_job_events(job_id, after=0):
+    while True:
+        events, finished = job_queue.events(job_id, after)
+        if events is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Unknown job'})}\n\n"
+            return
+        for event in events:
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+            after = event["id"]
+        if finished and not events:
+            return
+        if not events:
+            yield ": keep-alive\n\n"
+
+
+def event_stream_response(job_id, after=0):
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(stream_job_events(job_id, after)), mimetype="text/event-stream", headers=headers)
+
+
+# Define route for POST request at '/submit/stream' to queue a search and stream its partial results
+# (price history points, grid cells, listings) as server-sent events while it runs
+@app.route('/submit/stream', methods=['POST'])
+def submit_stream():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    try:
+        search = validate_searches([data])[0]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    job_id, waiter = job_queue.submit(search, use_cache=request.args.get("refresh") != "1")
+    print("Streaming job queued:", job_id)
+    response = event_stream_response(job_id)
+    # The stream has no JSON body, so the job id and waiter token travel as headers
+    response.headers.update({"X-Job-Id": job_id, "X-Waiter-Token": waiter})
+    return response
+
+
+# Define route for GET request at '/jobs/<job_id>/events' to (re)attach to a job's event stream;
+# a reconnecting client's Last-Event-ID resumes after the events it already has
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    after = request.headers.get("Last-Event-ID") or request.args.get("after") or 0
+    try:
+        after = int(after)
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer event id"}), 400
+    return event_stream_response(job_id, max(0, after))
+
+
+# Define route for GET request at '/jobs/<job_id>' to report a job's status
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job), 200
+
+
+# Define route for GET request at '/jobs/<job_id>/result' to fetch a finished job's artifacts
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] in ("queued", "running"):
+        return jsonify({"error": "Job not finished", "status": job["status"]}), 409
+    # A cancelled job will never have a result; a failed scrape is reported, not treated as a server fault
+    if job["status"] == "cancelled":
+        return jsonify({"error": job["error"], "status": job["status"], "stage": job["stage"]}), 410
+    if job["status"] == "failed":
+        return jsonify({"error": job["error"], "status": job["status"], "stage": job["stage"]}), 200
+    return jsonify({"message": "Success", "status": job["status"], "url": job["url"], "artifacts": job["artifacts"],
+                    "from_cache": job["from_cache"]}), 200
+
+
+# Define route for DELETE request at '/jobs/<job_id>?waiter=<token>' to withdraw one submitter from a job;
+# the scrape stops once every submitter attached to it has withdrawn
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    waiter = request.args.get("waiter")
+    if not waiter:
+        return jsonify({"error": "The waiter token returned by /submit is required"}), 400
+    cancelled = job_queue.cancel(job_id, waiter)
+    if cancelled is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if cancelled == UNKNOWN_WAITER:
+        return jsonify({"error": "Waiter token is not attached to this job, or has already cancelled"}), 403
+    if not cancelled:
+        return jsonify({"error": "Job already finished"}), 409
+    return jsonify({"message": "Cancellation requested", "job": job_queue.get(job_id)}), 202
+
+
+# Define route for POST request at '/submit_batch' to queue a list of searches and return a batch id immediately
+@app.route('/submit_batch', methods=['POST'])
+def submit_batch():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        searches = data.get("searches", [])
+        batch_id = batch_queue.submit(searches, workers=data.get("workers", 2))
+        batch = batch_queue.get(batch_id)
+        print(f"Batch queued: {batch_id} with {batch['total']} searches on {batch['workers']} workers")
+        return jsonify({"message": "Queued", "batch_id": batch_id, "total": batch["total"], "workers": batch["workers"]}), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        import traceback; traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# Define route for GET request at '/batches/<batch_id>' to report a batch's progress and, once done, its report
+@app.route('/batches/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    batch = batch_queue.get(batch_id)
+    if batch is None:
+        return jsonify({"error": "Unknown batch"}), 404
+    return jsonify(batch), 200
+
+
+# Define route for GET request at '/cache' to report result cache statistics
+@app.route('/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats()), 200
+
+
+# Define route for DELETE request at '/cache' to invalidate one search (JSON body) or the whole cache
+@app.route('/cache', methods=['DELETE'])
+def invalidate_cache():
+    try:
+        data = request.get_json(silent=True)
+        search = validate_searches([data])[0] if data else None
+        removed = result_cache.invalidate(search)
+        return jsonify({"message": "Invalidated", "removed": removed}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+# Define route for GET request at '/pool' to expose browser pool hit/miss and wait statistics
+@app.route('/pool', methods=['GET'])
+def pool_stats():
+    from driver_pool import get_pool
+    return jsonify(get_pool().stats()), 200
+
+
+# Define route for GET request at '/metrics' to expose per-stage latency histograms
+# (Prometheus text by default, '?format=json' for counts, means and estimated p50/p95)
+@app.route('/metrics', methods=['GET'])
+def stage_metrics():
+    if request.args.get("format") == "json":
+        return jsonify(metrics.snapshot()), 200
+    return Response(metrics.to_prometheus(), mimetype="text/plain; version=0.0.4"), 200
+
+
+# Define route for GET request at '/health' to answer liveness checks without loading the scraping stack
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok", "imports": import_report()}), 200
+
+
 if __name__ == '__main__':
+    # With debug=True the werkzeug reloader re-runs this module in a child process that does the serving;
+    # only that process warms up, so the watching parent never starts browsers of its own
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        # Load Selenium, BeautifulSoup, pandas and the pipeline once before serving, so the first search does not pay for them
+        if os.environ.get("PREWARM_IMPORTS", "1") == "1":
+            prewarm(BACKEND_MODULES)
+
+        # Launch the browser pool in the background so the first search finds a warm browser
+        from driver_pool import get_pool
+        threading.Thread(target=get_pool().prewarm, daemon=True).start()
     app.run(debug=True, port=5000, host='0.0.0.0')
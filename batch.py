@@ -0,0 +1,203 @@
+# Run many searches in parallel, each in its own worker process with its own browser
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+SEARCH_FIELDS = ("source", "destination", "departure", "trip_type", "arrival", "departure_until", "return_until")
+# Upper bound on the browser processes one batch may start, whatever a client asks for
+MAX_BATCH_WORKERS = int(os.environ.get("MAX_BATCH_WORKERS", 4))
+
+
+# Function to build a readable, unique job id for a search
+def make_job_id(index, search):
+    label = f"{search.get('source', '')}-{search.get('destination', '')}-{search.get('departure', '')}"
+    label = re.sub(r"[^A-Za-z0-9-]+", "_", label).strip("_")
+    return f"{index:03d}-{label}-{uuid.uuid4().hex[:6]}"
+
+
+# Worker initializer: one isolated browser per process
+def _init_worker():
+    os.environ["DRIVER_POOL_SIZE"] = "1"
+
+
+# Function executed inside a worker process for a single search
+def _run_job(job_id, search, output_dir):
+    from pipeline import run_search
+
+    started = time.time()
+    result = {"job_id": job_id, "search": search, "output_dir": output_dir}
+    try:
+        outcome = run_search(output_dir=output_dir, **search)
+        result.update(status="done", url=outcome["url"], artifacts=outcome["artifacts"], error=None)
+    except Exception as e:
+        traceback.print_exc()
+        result.update(status="failed", url=None, artifacts={}, error=str(e))
+    result["duration_seconds"] = round(time.time() - started, 2)
+    return result
+
+
+# Function to check and normalise the search dictionaries before any worker starts
+def validate_searches(searches):
+    if not isinstance(searches, list):
+        raise ValueError("Searches must be a list of search objects")
+    cleaned = []
+    for i, search in enumerate(searches):
+        if not isinstance(search, dict):
+            raise ValueError(f"Search {i} is not an object")
+        unknown = set(search) - set(SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"Search {i} has unknown fields: {sorted(unknown)}")
+        missing = [f for f in ("source", "destination", "departure") if not search.get(f)]
+        if missing:
+            raise ValueError(f"Search {i} is missing fields: {missing}")
+        search = dict(search)
+        search.setdefault("trip_type", "Round Trip")
+        if search["trip_type"] == "Round Trip" and not search.get("arrival"):
+            raise ValueError(f"Search {i} is a round trip without an arrival date")
+        # Sweep ranges page the round-trip date grid and must not end before they start
+        for field, start in (("departure_until", "departure"), ("return_until", "arrival")):
+            if search.get(field):
+                if search["trip_type"] != "Round Trip":
+                    raise ValueError(f"Search {i} sets {field}, which only applies to round trips")
+                if str(search[field]) < str(search[start]):
+                    raise ValueError(f"Search {i} has {field} before {start}")
+        cleaned.append(search)
+    return cleaned
+
+
+# Function to check a requested worker count: a positive int, clamped to max_workers
+def validate_workers(workers, max_workers=MAX_BATCH_WORKERS):
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        raise ValueError(f"Workers must be a positive integer, got {workers!r}")
+    return min(workers, max_workers)
+
+
+# Main function: run every search across `workers` processes and report per-job status and throughput
+def run_batch(searches, workers=2, output_root="batch_runs", on_job_done=None):
+    searches = validate_searches(searches)
+    os.makedirs(output_root, exist_ok=True)
+
+    jobs = []
+    for i, search in enumerate(searches):
+        job_id = make_job_id(i, search)
+        jobs.append((job_id, search, os.path.join(output_root, job_id)))
+
+    started = time.time()
+    results = {}
+    workers = max(1, min(workers, len(jobs))) if jobs else 1
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+        futures = {executor.submit(_run_job, *job): job for job in jobs}
+        for future in as_completed(futures):
+            job_id, search, output_dir = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died
+                result = {"job_id": job_id, "search": search, "output_dir": output_dir, "status": "failed",
+                          "url": None, "artifacts": {}, "error": str(e), "duration_seconds": None}
+            results[job_id] = result
+            print(f"Job {job_id} {result['status']}")
+            if on_job_done:
+                on_job_done(result)
+
+    wall_seconds = time.time() - started
+    succeeded = sum(1 for r in results.values() if r["status"] == "done")
+    return {
+        "jobs": [results[job_id] for job_id, _, _ in jobs],
+        "total": len(jobs),
+        "succeeded": succeeded,
+        "failed": len(jobs) - succeeded,
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_per_minute": round(len(jobs) / wall_seconds * 60, 2) if wall_seconds > 0 else None,
+    }
+
+
+class BatchQueue:
+    # Batches run one at a time on a background thread, so a request only waits for its batch id
+    # and at most max_workers browser processes are ever started for batches
+    def __init__(self, max_workers=MAX_BATCH_WORKERS, output_root="batch_runs", max_finished=50):
+        self.max_workers = max_workers
+        self.output_root = output_root
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch")
+        self._batches = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Validate and queue a batch, returning its id; the requested workers are clamped to max_workers
+    def submit(self, searches, workers=2):
+        searches = validate_searches(searches)
+        workers = validate_workers(workers, self.max_workers)
+        batch_id = uuid.uuid4().hex[:12]
+        batch = {
+            "batch_id": batch_id,
+            "status": "queued",
+            "total": len(searches),
+            "completed": 0,
+            "workers": workers,
+            "submitted_at": datetime.now().isoformat(timespec="seconds"),
+            "finished_at": None,
+            "report": None,
+            "error": None,
+        }
+        with self._lock:
+            self._batches[batch_id] = batch
+            self._evict_finished()
+        self._executor.submit(self._run, batch_id, searches, workers)
+        return batch_id
+
+    # Snapshot of a batch's progress and, once done, its report; None if the id is unknown
+    def get(self, batch_id):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return dict(batch) if batch else None
+
+    def _run(self, batch_id, searches, workers):
+        with self._lock:
+            batch = self._batches[batch_id]
+            batch["status"] = "running"
+
+        def on_job_done(result):
+            with self._lock:
+                batch["completed"] += 1
+
+        try:
+            report = run_batch(searches, workers=workers, output_root=self.output_root, on_job_done=on_job_done)
+            with self._lock:
+                batch.update(status="done", report=report)
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                batch.update(status="failed", error=str(e))
+        with self._lock:
+            batch["finished_at"] = datetime.now().isoformat(timespec="seconds")
+
+    # Forget the oldest finished batches beyond max_finished; their output folders are kept
+    def _evict_finished(self):
+        finished = [batch_id for batch_id, batch in self._batches.items() if batch["status"] in ("done", "failed")]
+        for batch_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._batches[batch_id]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape a list of searches in parallel")
+    parser.add_argument("searches", help="JSON file holding a list of searches")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--output-root", default="batch_runs")
+    args = parser.parse_args()
+
+    with open(args.searches, "r", encoding="utf-8") as f:
+        searches = json.load(f)
+
+    report = run_batch(searches, workers=args.workers, output_root=args.output_root)
+    print(json.dumps(report, indent=4))
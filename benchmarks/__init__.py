@@ -0,0 +1 @@
+# Benchmarks for the data processing and AI summary stages; run with `python -m benchmarks.run_benchmarks`
@@ -0,0 +1,67 @@
+# Deterministic synthetic inputs shaped like real scrapes: price history aria-labels and round-trip grid rows
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+REFERENCE_DATE = date(2025, 3, 1)
+HISTORY_DAYS = 60
+GRID_DEPARTURE_DAYS = 300
+GRID_MAX_DURATION = 21
+MALFORMED_RATE = 0.001
+
+
+def _price_labels(low=150, high=3000):
+    # "A$1,234" for every whole-dollar price in range
+    return np.array([f"A${p:,}" for p in range(low, high + 1)], dtype=object), low
+
+
+# Function to generate n price history labels ("Today - A$123", "12 days ago - A$456"), with a few malformed rows
+def price_history_labels(n, seed=0):
+    rng = np.random.default_rng(seed)
+    prices, low = _price_labels()
+
+    days = np.arange(n) % HISTORY_DAYS
+    # A random walk around a base fare, like the graph's daily points
+    walk = np.cumsum(rng.normal(0, 25, n)) % 900 + 300
+    price_text = prices[walk.astype(np.int64) - low]
+
+    day_text = np.where(days == 0, "Today", pd.Series(days).astype(str).to_numpy(dtype=object) + " days ago")
+    labels = day_text + " - " + price_text
+
+    malformed = rng.random(n) < MALFORMED_RATE
+    labels[malformed] = "Price unavailable"
+    return pd.DataFrame({"aria-label": labels})
+
+
+# Function to generate n round-trip grid rows with Price ("A$1,234") and Dates ("Mar 04 to Mar 11, low price")
+def price_matrix_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    prices, low = _price_labels()
+
+    # Every departure/duration pair is one distinct Dates string, as in a real grid
+    vocabulary = []
+    for offset in range(GRID_DEPARTURE_DAYS):
+        departure = REFERENCE_DATE + timedelta(days=offset)
+        for duration in range(1, GRID_MAX_DURATION + 1):
+            returning = departure + timedelta(days=duration)
+            vocabulary.append(f"{departure:%b %d} to {returning:%b %d}")
+    vocabulary = np.array(vocabulary, dtype=object)
+
+    dates = vocabulary[rng.integers(0, len(vocabulary), n)]
+    category = rng.random(n)
+    dates = np.where(category < 0.1, dates + ", cheapest price", np.where(category < 0.3, dates + ", low price", dates))
+    dates[rng.integers(0, n)] += ", selected"
+
+    price_index = np.clip(rng.lognormal(6.6, 0.4, n).astype(np.int64), low, low + len(prices) - 1) - low
+    return pd.DataFrame({"Price": prices[price_index], "Dates": dates})
+
+
+# Function to write a generated frame as CSV and stamp it with the reference date, which readers use as the scrape day
+def write_csv(df, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df.to_csv(path, index=False)
+    stamp = pd.Timestamp(REFERENCE_DATE).timestamp()
+    os.utime(path, (stamp, stamp))
+    return path
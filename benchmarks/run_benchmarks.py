@@ -0,0 +1,155 @@
+# Time and memory benchmarks for process1 and api_integration, with stored baselines to catch regressions
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generators import REFERENCE_DATE, price_history_labels, price_matrix_rows, write_csv
+from process1 import process_price_history, load_and_clean_data, analyze_flight_statistics
+from flight_stats import compute_flight_aggregates
+from api_integration import prepare_data_summary
+
+DEFAULT_SIZES = "1k,10k,100k,1M"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# A run is flagged when it is this much slower, or uses this much more peak memory, than the baseline
+DEFAULT_TOLERANCE = 0.25
+SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+# Function to parse "1k" / "10M" / "2500" into a row count
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+# Function to run fn once for wall time (best of `repeat`) and once under tracemalloc for peak memory
+def measure(fn, rows, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+
+# Function to benchmark every stage at one input size; parsed frames feed the later stages
+def bench_size(rows, workdir, repeat=3, seed=0):
+    history_path = write_csv(price_history_labels(rows, seed), os.path.join(workdir, f"price_history_{rows}.csv"))
+    matrix_path = write_csv(price_matrix_rows(rows, seed), os.path.join(workdir, f"price_matrix_{rows}.csv"))
+
+    df = load_and_clean_data(matrix_path, reference_date=REFERENCE_DATE)
+    aggregates = compute_flight_aggregates(df)
+    stages = {
+        "process_price_history": lambda: process_price_history(history_path, reference_date=REFERENCE_DATE),
+        "load_and_clean_data": lambda: load_and_clean_data(matrix_path, reference_date=REFERENCE_DATE),
+        "compute_flight_aggregates": lambda: compute_flight_aggregates(df),
+        # Outside `streamlit run` the st.* calls are no-ops, so this measures the analytics and figure building
+        "analyze_flight_statistics": lambda: analyze_flight_statistics(df, aggregates),
+        "prepare_data_summary": lambda: prepare_data_summary(df, aggregates),
+    }
+
+    results = {}
+    for name, fn in stages.items():
+        results[name] = measure(fn, rows, repeat)
+        print(f"  {name:<28} {results[name]['seconds']:>10.4f}s {results[name]['rows_per_second'] or 0:>14,.0f} rows/s {results[name]['peak_mb']:>10.1f} MB peak")
+    return results
+
+
+# Function to compare a run with a baseline; returns one message per stage and size that got worse
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    regressions = []
+    for size, stages in results.items():
+        for name, current in stages.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous is None:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                    change = current[metric] / previous[metric] - 1
+                    regressions.append(f"{name} @ {size} rows: {metric} {previous[metric]} -> {current[metric]} (+{change:.0%})")
+    return regressions
+
+
+def run_benchmarks(sizes, repeat=3, seed=0, workdir=None):
+    owns_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="airline-bench-")
+    try:
+        results = {}
+        for rows in sizes:
+            print(f"{rows:,} rows")
+            results[str(rows)] = bench_size(rows, workdir, repeat, seed)
+        return results
+    finally:
+        if owns_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data processing stages on synthetic scrapes.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated row counts, e.g. 1k,100k,10M")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown/memory growth, e.g. 0.25")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    results = run_benchmarks(sizes, args.repeat, args.seed)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline["results"], args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
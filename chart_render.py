@@ -0,0 +1,117 @@
+# Chart builders that stay responsive on long series: WebGL above a point threshold, LTTB downsampling for lines
+import os
+
+import numpy as np
+import pandas as pd
+
+# Above this many points a trace is drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = int(os.environ.get("CHART_WEBGL_THRESHOLD", 5000))
+# Line charts are downsampled to at most this many points in total
+MAX_LINE_POINTS = int(os.environ.get("CHART_MAX_LINE_POINTS", 2000))
+
+
+# Function to pick "webgl" or "svg" for a trace of n points
+def render_mode(n, threshold=None):
+    threshold = WEBGL_THRESHOLD if threshold is None else threshold
+    return "webgl" if n > threshold else "svg"
+
+
+# Function to choose n_out indices by Largest-Triangle-Three-Buckets; keeps the first and last point
+# and, per bucket, the point forming the largest triangle with its neighbours, so peaks and troughs survive
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    indices[n_out - 1] = n - 1
+    return indices
+
+
+def _numeric_axis(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    # Category labels such as "Mar 04" are spaced by position
+    return np.arange(len(values), dtype=np.float64)
+
+
+# Function to downsample each line of a long-form frame to its share of max_points
+def downsample_lines(df, x, y, color=None, max_points=None):
+    max_points = MAX_LINE_POINTS if max_points is None else max_points
+    df = df.dropna(subset=[y])
+    if len(df) <= max_points:
+        return df
+
+    groups = [df] if color is None else [group for _, group in df.groupby(color, observed=True, sort=False)]
+    per_line = max(3, max_points // len(groups))
+    kept = []
+    for group in groups:
+        xs = _numeric_axis(group[x])
+        order = np.argsort(xs, kind="stable")
+        ys = group[y].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        kept.append(group.iloc[order[lttb(xs[order], ys, per_line)]])
+    return pd.concat(kept)
+
+
+# px.line with downsampling and automatic WebGL; a list of y columns is drawn as one line per column
+def line_chart(df, x, y, color=None, max_points=None, **kwargs):
+    import plotly.express as px
+
+    if isinstance(y, (list, tuple)):
+        df = df.melt(id_vars=[x], value_vars=list(y), var_name="variable", value_name="value")
+        y, color = "value", "variable"
+    df = downsample_lines(df, x, y, color, max_points)
+    return px.line(df, x=x, y=y, color=color, render_mode=render_mode(len(df)), **kwargs)
+
+
+# px.scatter with automatic WebGL; every point is kept
+def scatter_chart(df, **kwargs):
+    import plotly.express as px
+    return px.scatter(df, render_mode=render_mode(len(df)), **kwargs)
+
+
+# px.box below the threshold; above it the quartiles and whiskers are computed here and only
+# five numbers per box are sent, instead of every point
+def box_chart(df, x, y, title=None, labels=None):
+    # Plotly is loaded on the first chart rather than when the module is imported
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    if len(df) <= WEBGL_THRESHOLD:
+        return px.box(df, x=x, y=y, title=title, labels=labels)
+
+    grouped = df.dropna(subset=[y]).groupby(x, observed=True)[y]
+    q1 = grouped.quantile(0.25)
+    q3 = grouped.quantile(0.75)
+    reach = 1.5 * (q3 - q1)
+    # Whiskers end at the most extreme points still within 1.5 IQR of the box, as plotly draws them
+    within = df[y].between(df[x].map(q1 - reach).astype(float), df[x].map(q3 + reach).astype(float))
+    whiskers = df[within].groupby(x, observed=True)[y].agg(["min", "max"]).reindex(q1.index)
+
+    fig = go.Figure(go.Box(
+        x=q1.index.astype(str),
+        q1=q1.to_numpy(),
+        median=grouped.median().to_numpy(),
+        q3=q3.to_numpy(),
+        lowerfence=whiskers["min"].to_numpy(),
+        upperfence=whiskers["max"].to_numpy(),
+        boxpoints=False,
+    ))
+    labels = labels or {}
+    fig.update_layout(title=title, xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y))
+    return fig
@@ -0,0 +1,121 @@
+# Sweep of the round-trip date grid across a departure and return range, merging every window into one matrix
+import os
+import re
+from datetime import timedelta
+
+from grid_dates import parse_grid_date
+
+# Page turns allowed in one sweep, and the latency budget a sweeping search gets instead of the default
+SWEEP_MAX_PAGES = int(os.environ.get("SWEEP_MAX_PAGES", 40))
+SWEEP_LATENCY_BUDGET = float(os.environ.get("SWEEP_LATENCY_BUDGET", 300))
+
+# Grid page turns, named after the arrow buttons around the grid
+EARLIER_DEPARTURES = "earlier_departures"
+LATER_DEPARTURES = "later_departures"
+EARLIER_RETURNS = "earlier_returns"
+LATER_RETURNS = "later_returns"
+
+# Same date extraction as process1.DATES_PATTERN: "Mar 4 ... to Mar 11"
+GRID_DATES = re.compile(r"(\w+ \d+).*?to (\w+ \d+)")
+
+
+# True when a search asks for more than the single grid window around its dates
+def is_sweep(search):
+    return bool(search.get("departure_until") or search.get("return_until"))
+
+
+class DateGridSweep:
+    def __init__(self, departure_range, return_range):
+        self.departure_start, self.departure_end = departure_range
+        # Grid years are inferred from the start of the range, never from today: a sweep months
+        # ahead would otherwise resolve every header a year late
+        self.reference_date = self.departure_start
+        self.return_start, self.return_end = return_range
+        self.cells = {}
+        self.window = None
+        self.stalled = False
+        self.last_move = None
+        # A fresh window may start after the range, and each departure step may leave returns behind
+        self.rewinding_departures = True
+        self.rewinding_returns = True
+
+    # Process one grid window, returning only the in-range cells not seen in an earlier window
+    def ingest(self, rows):
+        new_rows = []
+        departures, returns = [], []
+        for row in rows:
+            match = GRID_DATES.search(row["Dates"])
+            if not match:
+                continue
+            departure = parse_grid_date(match.group(1), self.reference_date)
+            returning = parse_grid_date(match.group(2), departure) if departure else None
+            if departure is None or returning is None:
+                continue
+            departures.append(departure)
+            returns.append(returning)
+
+            key = (departure, returning)
+            if key in self.cells or not self._in_range(departure, returning):
+                continue
+            self.cells[key] = row
+            new_rows.append(row)
+
+        window = (min(departures), max(departures), min(returns), max(returns)) if departures else None
+        # An unchanged window means the last page turn did nothing, e.g. a disabled arrow
+        self.stalled = window is None or window == self.window
+        if window is not None:
+            self.window = window
+        return new_rows
+
+    # Record that a page turn never rendered a new window
+    def mark_stalled(self):
+        self.stalled = True
+
+    # The page turn that brings the next uncovered part of the range into view, or None when done
+    def next_move(self):
+        if self.window is None:
+            return None
+        min_departure, max_departure, min_return, max_return = self.window
+        blocked = self.last_move if self.stalled else None
+
+        if self.rewinding_departures:
+            if min_departure > self.departure_start and blocked != EARLIER_DEPARTURES:
+                return self._move(EARLIER_DEPARTURES)
+            self.rewinding_departures = False
+            blocked = None
+
+        if self.rewinding_returns:
+            if min_return > max(self.return_start, min_departure) and blocked != EARLIER_RETURNS:
+                return self._move(EARLIER_RETURNS)
+            self.rewinding_returns = False
+            blocked = None
+
+        if max_return < self.return_end and blocked != LATER_RETURNS:
+            return self._move(LATER_RETURNS)
+        if max_departure < self.departure_end and blocked != LATER_DEPARTURES:
+            self.rewinding_returns = True
+            return self._move(LATER_DEPARTURES)
+        return None
+
+    # Merged rows in departure/return order, in the Price/Dates layout of flight_price_matrix.csv
+    def matrix(self):
+        return [self.cells[key] for key in sorted(self.cells)]
+
+    # Share of the requested departure/return combinations (return on or after departure) that were captured
+    def coverage(self):
+        departures = (self.departure_end - self.departure_start).days + 1
+        expected = sum(
+            max(0, (self.return_end - max(self.return_start, self.departure_start + timedelta(days=d))).days + 1)
+            for d in range(departures)
+        )
+        return round(len(self.cells) / expected, 3) if expected else 1.0
+
+    def _in_range(self, departure, returning):
+        return (self.departure_start <= departure <= self.departure_end
+                and self.return_start <= returning <= self.return_end
+                and returning >= departure)
+
+    def _move(self, move):
+        self.last_move = move
+        self.stalled = False
+        return move
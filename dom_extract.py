@@ -0,0 +1,88 @@
+# Bulk DOM extraction: each section is read with one execute_script call instead of one WebDriver round trip per node
+
+# aria-labels of the price history points, following the same <g> structure the graph is drawn with
+PRICE_HISTORY_JS = """
+var container = arguments[0];
+var graph = container.querySelector('[series-id="Price history"]');
+if (!graph) { return []; }
+var target = null;
+for (var i = 0; i < graph.children.length; i++) {
+    var g = graph.children[i];
+    if (g.tagName.toLowerCase() !== 'g' || g.getAttribute('aria-hidden') === 'true') { continue; }
+    if (g.querySelector('g[aria-label]')) { target = g; break; }
+}
+if (!target) { return null; }
+var labels = [];
+for (var j = 0; j < target.children.length; j++) {
+    var point = target.children[j];
+    if (point.tagName.toLowerCase() !== 'g') { continue; }
+    var child = null;
+    for (var k = 0; k < point.children.length; k++) {
+        if (point.children[k].tagName.toLowerCase() === 'g') { child = point.children[k]; break; }
+    }
+    var label = child && child.getAttribute('aria-label');
+    if (label) { labels.push(label); }
+}
+return labels;
+"""
+
+# aria-labels of every priced cell in the round-trip date grid
+GRID_LABELS_JS = """
+var cells = arguments[0].querySelectorAll('div[aria-label][role="button"]');
+var labels = [];
+for (var i = 0; i < cells.length; i++) { labels.push(cells[i].getAttribute('aria-label')); }
+return labels;
+"""
+
+# Header and price columns of the one-way grid with their translate3d x offsets
+ONE_WAY_COLUMNS_JS = """
+function offset(el, fallback) {
+    var style = (el && el.getAttribute('style')) || '';
+    var match = /translate3d\\(([-\\d.]+)px/.exec(style);
+    return match ? parseFloat(match[1]) : fallback;
+}
+var headers = [];
+document.querySelectorAll('div[jsname="vCVVjd"] > div.qh9ymb > div.pJYzRb').forEach(function (h) {
+    var spans = h.getElementsByTagName('span');
+    if (spans.length < 2) { return; }
+    headers.push({x_offset: offset(h.parentElement, 0.0), day: spans[0].textContent.trim(), date: spans[1].textContent.trim()});
+});
+var prices = [];
+document.querySelectorAll('div[data-row][data-col].QB2Jof').forEach(function (p) {
+    prices.push({x_offset: offset(p.parentElement, null), price: p.innerText.trim()});
+});
+return {headers: headers, prices: prices};
+"""
+
+# Serialized markup of one element, stored by capture mode for offline parsing
+OUTER_HTML_JS = "return arguments[0].outerHTML;"
+
+
+# Function to pull all price history aria-labels under the graph container; None if the series group is missing
+def extract_price_history_labels(driver, container):
+    return driver.execute_script(PRICE_HISTORY_JS, container)
+
+
+# Function to pull all aria-labels from the round-trip date grid container
+def extract_grid_labels(driver, container):
+    return [label for label in driver.execute_script(GRID_LABELS_JS, container) if label]
+
+
+# Function to pull the one-way grid headers and prices as plain dictionaries
+def extract_one_way_columns(driver):
+    return driver.execute_script(ONE_WAY_COLUMNS_JS)
+
+
+# Function to read an element's outerHTML in one call
+def extract_outer_html(driver, element):
+    return driver.execute_script(OUTER_HTML_JS, element)
+
+
+# Function to split priced grid labels ("A$123, Mar 4 to Mar 11, ...") into Price/Dates rows
+def split_grid_labels(labels):
+    rows = []
+    for aria in labels:
+        if "A$" in aria:
+            price_part, date_range = aria.split(",", 1)
+            rows.append({"Price": price_part.strip(), "Dates": date_range.strip()})
+    return rows
@@ -0,0 +1,215 @@
+# Pool of warm headless Chrome sessions used by scrapper1.data_scrapper
+import atexit
+import os
+import threading
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from metrics import span
+
+HOME_URL = "https://www.google.com/travel/flights?gl=AU&hl=en"
+
+
+# Function to launch a headless Chrome browser already sitting on the Google Flights home page
+def create_driver():
+    chrome_option = Options()
+    chrome_option.add_argument('--headless=new')
+    chrome_option.add_argument('--disable-gpu')
+    chrome_option.add_argument("--start-maximized")
+    driver = webdriver.Chrome(options=chrome_option)
+    driver.get(HOME_URL)
+    return driver
+
+
+# Function to check that a browser session is still alive and usable
+def is_healthy(driver):
+    try:
+        return driver.execute_script("return document.readyState") == "complete"
+    except Exception:
+        return False
+
+
+# Function to quit a browser without letting a dead session raise
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class DriverPool:
+    def __init__(self, max_size=2, max_uses=20, checkout_timeout=120, factory=create_driver):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self.factory = factory
+
+        self._lock = threading.Condition()
+        self._idle = []
+        self._uses = {}
+        self._total = 0
+        self._closed = False
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "recycled": 0,
+            "unhealthy": 0,
+        }
+
+    # Launch browsers up front so the first searches find a warm session
+    def prewarm(self, count=None):
+        count = self.max_size if count is None else min(count, self.max_size)
+        while True:
+            with self._lock:
+                if self._closed or self._total >= count:
+                    return
+                self._total += 1
+            driver = self._launch()
+            if driver is None:
+                return
+            with self._lock:
+                self._idle.append(driver)
+                self._lock.notify()
+
+    # Hand out a warm browser, launching one if the pool has room, otherwise wait for a return
+    def checkout(self):
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._lock:
+                while not self._idle and self._total >= self.max_size:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    remaining = self.checkout_timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        raise TimeoutError(f"No browser available after {self.checkout_timeout}s")
+                    waited = True
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    driver = self._idle.pop()
+                    launch = False
+                else:
+                    self._total += 1
+                    driver = None
+                    launch = True
+
+            if launch:
+                driver = self._launch()
+                if driver is None:
+                    raise RuntimeError("Failed to launch Chrome")
+                self._record_checkout(start, waited, hit=False)
+                return driver
+
+            if is_healthy(driver):
+                self._record_checkout(start, waited, hit=True)
+                return driver
+
+            # Dead session: drop it and try again
+            self._discard(driver, reason="unhealthy")
+
+    # Give a browser back; it is reset to the home page in the background, or recycled if worn out
+    def release(self, driver, healthy=True):
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+            closed = self._closed
+
+        if closed or not healthy or uses >= self.max_uses:
+            self._discard(driver, reason="recycled" if healthy else "unhealthy")
+            return
+
+        threading.Thread(target=self._reset_and_return, args=(driver,), daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._total
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._total - len(self._idle)
+            stats["max_size"] = self.max_size
+            stats["max_uses"] = self.max_uses
+        checkouts = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / checkouts, 3) if checkouts else None
+        stats["wait_seconds_avg"] = round(stats["wait_seconds_total"] / stats["waits"], 3) if stats["waits"] else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for driver in idle:
+            self._discard(driver, reason=None)
+
+    def _launch(self):
+        try:
+            with span("browser_start"):
+                driver = self.factory()
+        except Exception as e:
+            print("Error launching Chrome:", e)
+            with self._lock:
+                self._total -= 1
+                self._lock.notify()
+            return None
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def _reset_and_return(self, driver):
+        try:
+            driver.delete_all_cookies()
+            driver.get(HOME_URL)
+        except Exception:
+            self._discard(driver, reason="unhealthy")
+            return
+        with self._lock:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._idle.append(driver)
+                self._lock.notify()
+        if closed:
+            self._discard(driver, reason=None)
+
+    def _discard(self, driver, reason):
+        quit_driver(driver)
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self._total -= 1
+            if reason:
+                self._stats[reason] += 1
+            self._lock.notify()
+
+    def _record_checkout(self, start, waited, hit):
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self._stats["hits" if hit else "misses"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += elapsed
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], elapsed)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Function to get the process-wide pool, sized from DRIVER_POOL_SIZE / DRIVER_POOL_MAX_USES
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(
+                max_size=int(os.environ.get("DRIVER_POOL_SIZE", 2)),
+                max_uses=int(os.environ.get("DRIVER_POOL_MAX_USES", 20)),
+            )
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,77 @@
+# Indexed SQLite store for one-way fares, replacing the ever-growing flight_prices.csv
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+DEFAULT_PATH = os.environ.get("FARE_STORE_PATH", "fares.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fares (
+    id INTEGER PRIMARY KEY,
+    route TEXT NOT NULL,
+    day TEXT NOT NULL,
+    date TEXT NOT NULL,
+    price TEXT NOT NULL,
+    scrape_date TEXT NOT NULL,
+    scraped_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS fares_unique ON fares (route, day, date, price, scrape_date);
+CREATE INDEX IF NOT EXISTS fares_route_scrape ON fares (route, scrape_date);
+"""
+
+
+# Function to build the key a route is stored under, e.g. "sydney-melbourne"
+def route_key(source, destination):
+    return f"{source.strip().lower()}-{destination.strip().lower()}"
+
+
+class FareStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # A short-lived connection per call keeps the store safe to use from threads and worker processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Insert scraped rows ({"Day", "Date", "Price"}); duplicates are skipped by the unique index
+    def add_fares(self, route, rows, scraped_at=None):
+        scraped_at = scraped_at or datetime.now()
+        params = [
+            (route, row["Day"], row["Date"], row["Price"], scraped_at.strftime("%Y-%m-%d"), scraped_at.isoformat(timespec="seconds"))
+            for row in rows
+        ]
+        if not params:
+            return 0
+        with closing(self._connect()) as conn, conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO fares (route, day, date, price, scrape_date, scraped_at) VALUES (?, ?, ?, ?, ?, ?)",
+                params,
+            )
+            return conn.total_changes - before
+
+    # Read fares back as dictionaries, optionally for one route and from a scrape date onwards
+    def fares(self, route=None, since=None):
+        query = "SELECT route, day, date, price, scrape_date, scraped_at FROM fares"
+        clauses, params = [], []
+        if route is not None:
+            clauses.append("route = ?")
+            params.append(route)
+        if since is not None:
+            clauses.append("scrape_date >= ?")
+            params.append(str(since))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY route, scrape_date, id"
+
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def routes(self):
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT route FROM fares ORDER BY route")]
@@ -0,0 +1,67 @@
+# Shared aggregation engine: every dashboard and AI summary consumer reads from one precomputed result
+import pandas as pd
+
+# Rollup name -> column it groups by
+DIMENSIONS = {
+    'departure_day': 'Departure_Day',
+    'return_day': 'Return_Day',
+    'duration': 'Trip_Duration',
+    'category': 'Price_Category',
+}
+WEEKEND_DAYS = ['Saturday', 'Sunday']
+STATS_COLUMNS = {'mean': 'Average Price', 'min': 'Minimum Price', 'max': 'Maximum Price', 'count': 'Count'}
+
+
+def compute_flight_aggregates(df):
+    prices = df['Price_Numeric'].astype('float64')
+
+    # One pass over the rows: partial sums/min/max/count for every combination of the four dimensions
+    partial = (
+        df[list(DIMENSIONS.values())]
+        .assign(_price=prices)
+        .groupby(list(DIMENSIONS.values()), observed=True, dropna=False)['_price']
+        .agg(['sum', 'count', 'min', 'max'])
+    )
+
+    # Each dimension is then rolled up from that small table instead of re-scanning the rows
+    aggregates = {}
+    for name, column in DIMENSIONS.items():
+        rolled = partial.groupby(level=column, observed=True).agg({'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'})
+        rolled = rolled[rolled['count'] > 0]
+        stats = pd.DataFrame({
+            'mean': rolled['sum'] / rolled['count'],
+            'min': rolled['min'],
+            'max': rolled['max'],
+            'count': rolled['count'].astype('int64'),
+        })
+        aggregates[name] = stats.round(2)
+
+    # Weekend vs weekday departures from the departure-day partials
+    by_day = partial.groupby(level='Departure_Day', observed=True)[['sum', 'count']].sum()
+    weekend = by_day[by_day.index.isin(WEEKEND_DAYS)].sum()
+    weekday = by_day[~by_day.index.isin(WEEKEND_DAYS)].sum()
+    aggregates['weekend_vs_weekday'] = {
+        'weekend_avg': weekend['sum'] / weekend['count'] if weekend['count'] > 0 else None,
+        'weekday_avg': weekday['sum'] / weekday['count'] if weekday['count'] > 0 else None,
+    }
+
+    aggregates['overall'] = {
+        'count': int(prices.count()),
+        'min': prices.min(),
+        'max': prices.max(),
+        'mean': prices.mean(),
+        'median': prices.median(),
+        'std': prices.std(),
+    }
+
+    # Extreme rows
+    has_prices = prices.notna().any()
+    aggregates['cheapest'] = df.loc[prices.idxmin()] if has_prices else None
+    aggregates['most_expensive'] = df.loc[prices.idxmax()] if has_prices else None
+
+    return aggregates
+
+
+# Function to give a rollup the column names shown in the dashboard tables
+def format_stats_table(stats):
+    return stats.rename(columns=STATS_COLUMNS)
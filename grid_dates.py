@@ -0,0 +1,62 @@
+# Year inference for the year-less dates on the Google Flights grids ("Aug 14", "Mon, Aug 14"),
+# shared by the round-trip matrix parser, the one-way grid pager and the date grid sweep
+from datetime import datetime, timedelta
+
+GRID_DATE_FORMATS = ("%b %d", "%d %b", "%B %d", "%d %B", "%a, %b %d", "%a, %d %b")
+# How far before the reference date a grid may still show a column
+LOOKBACK_DAYS = 31
+
+
+def parse_grid_date(text, reference_date):
+    """Turn a grid date such as "Aug 14" into a date, or None if it cannot be parsed.
+
+    Rule: the result is the first occurrence of that month and day on or after
+    reference_date - LOOKBACK_DAYS, so dates up to about eleven months after the
+    reference resolve correctly.
+
+    reference_date must be the earliest date the grid can show, or at most
+    LOOKBACK_DAYS after it: the scrape date for the round-trip matrix, the departure
+    date for the one-way grid, the start of the departure range for a sweep, and a
+    cell's departure date for its return date. It must not be "today" for a search
+    months ahead, or every column resolves a year late.
+
+    The year is attached before parsing, so "Feb 29" only resolves to a leap year.
+    """
+    start = reference_date - timedelta(days=LOOKBACK_DAYS)
+    for fmt in GRID_DATE_FORMATS:
+        candidates = []
+        for year in (start.year, start.year + 1):
+            try:
+                parsed = datetime.strptime(f"{text} {year}", f"{fmt} %Y").date()
+            except ValueError:
+                continue
+            if parsed >= start:
+                candidates.append(parsed)
+        if candidates:
+            return min(candidates)
+    return None
+
+
+# Vectorised parse_grid_date, same rule, for a Series of "Aug 14" / "August 14" strings. reference_date is a
+# single date or a Series aligned with values (e.g. each cell's departure for its return). Unparsable values are NaT
+def parse_grid_dates(values, reference_date):
+    import pandas as pd
+
+    if isinstance(reference_date, pd.Series):
+        start = pd.to_datetime(reference_date).dt.normalize() - pd.Timedelta(days=LOOKBACK_DAYS)
+        years = start.dt.year.astype("Int64")
+    else:
+        start = pd.Timestamp(reference_date).normalize() - pd.Timedelta(days=LOOKBACK_DAYS)
+        years = start.year
+    this_year = _parse_month_day(values, years)
+    next_year = _parse_month_day(values, years + 1)
+    # NaT (e.g. Feb 29 outside a leap year) also falls through to the next year
+    return this_year.where(this_year >= start, next_year)
+
+
+def _parse_month_day(values, years):
+    import pandas as pd
+
+    text = values + " " + (years.astype(str) if isinstance(years, pd.Series) else str(years))
+    parsed = pd.to_datetime(text, format="%b %d %Y", errors="coerce")
+    return parsed.fillna(pd.to_datetime(text, format="%B %d %Y", errors="coerce"))
@@ -0,0 +1,120 @@
+# Append-only Parquet history of every scrape, partitioned by artifact kind, route and scrape date
+import json
+import os
+import uuid
+from datetime import datetime
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from fare_store import route_key
+from price_series import PriceSeriesStore
+
+DEFAULT_ROOT = os.environ.get("HISTORY_STORE_PATH", "history")
+PARTITION_SCHEMA = pa.schema([("route", pa.string()), ("scrape_date", pa.string())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+
+# One fixed schema per artifact kind, used for every write and every read, so files from scrapes of
+# different sizes (dictionary widths, int vs float prices) always read back as one table
+TIMESTAMP = pa.timestamp("us")
+SCHEMAS = {
+    "price_history": pa.schema([
+        ("Date", TIMESTAMP), ("Price", pa.float64()), ("scraped_at", TIMESTAMP),
+    ]),
+    "price_matrix": pa.schema([
+        ("Price", pa.string()), ("Dates", pa.string()), ("Price_Numeric", pa.float64()),
+        ("Departure_Date", TIMESTAMP), ("Return_Date", TIMESTAMP), ("Trip_Duration", pa.int16()),
+        ("Price_Category", pa.string()), ("Departure_Day", pa.string()), ("Return_Day", pa.string()),
+        ("Is_Selected", pa.bool_()), ("scraped_at", TIMESTAMP),
+    ]),
+    "listings": pa.schema([
+        ("company_name", pa.string()), ("flight_duration", pa.string()), ("price", pa.string()),
+        ("departure_date", pa.string()), ("arrival_date", pa.string()), ("co2_emission", pa.string()),
+        ("stops", pa.string()), ("scraped_at", TIMESTAMP),
+    ]),
+}
+
+
+# Function to append one scrape's rows for a route as a new Parquet file; existing files are never rewritten
+def append_artifact(kind, route, df, scraped_at=None, root=DEFAULT_ROOT):
+    if df is None or df.empty:
+        return None
+    scraped_at = scraped_at or datetime.now()
+    directory = os.path.join(root, kind, f"route={quote(route, safe='')}", f"scrape_date={scraped_at:%Y-%m-%d}")
+    os.makedirs(directory, exist_ok=True)
+
+    df = df.assign(scraped_at=pd.Timestamp(scraped_at))
+    path = os.path.join(directory, f"part-{scraped_at:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+    pq.write_table(_to_table(kind, df), path)
+    return path
+
+
+# Function to convert a frame to its kind's fixed schema: categoricals become plain strings and numbers
+# get one width, so a small scrape and a large one write the same column types
+def _to_table(kind, df):
+    schema = SCHEMAS.get(kind)
+    if schema is None:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    columns = []
+    for field in schema:
+        values = df[field.name] if field.name in df else pd.Series(None, index=df.index, dtype=object)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object).where(values.notna(), None)
+        columns.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+# Function to read an artifact kind, loading only the requested columns and only the matching partitions
+def read_artifact(kind, columns=None, routes=None, start_date=None, end_date=None, root=DEFAULT_ROOT):
+    directory = os.path.join(root, kind)
+    if not os.path.isdir(directory):
+        return pd.DataFrame(columns=columns)
+
+    # Reading through the fixed schema also casts files written before it existed, e.g. dictionary columns
+    schema = SCHEMAS.get(kind)
+    if schema is not None:
+        schema = pa.unify_schemas([schema, PARTITION_SCHEMA])
+    dataset = ds.dataset(directory, format="parquet", partitioning=PARTITIONING, schema=schema)
+    expression = None
+    if routes is not None:
+        expression = _and(expression, ds.field("route").isin(list(routes)))
+    if start_date is not None:
+        expression = _and(expression, ds.field("scrape_date") >= str(start_date))
+    if end_date is not None:
+        expression = _and(expression, ds.field("scrape_date") <= str(end_date))
+
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def _and(expression, clause):
+    return clause if expression is None else expression & clause
+
+
+# Function to record the artifacts of a finished search, parsed once into typed columns
+def record_search(search, artifacts, scraped_at=None, root=DEFAULT_ROOT, series_store=None):
+    # Imported here because process1 itself reads from this module
+    from process1 import process_price_history, load_and_clean_data
+
+    scraped_at = scraped_at or datetime.now()
+    route = route_key(search["source"], search["destination"])
+    written = {}
+
+    if "price_history" in artifacts:
+        df = process_price_history(artifacts["price_history"], reference_date=scraped_at.date())
+        written["price_history"] = append_artifact("price_history", route, df, scraped_at, root)
+        # Fold the window into the route's long-term series so its rolling statistics stay current
+        (series_store or PriceSeriesStore()).append(route, df)
+
+    if "price_matrix" in artifacts:
+        df = load_and_clean_data(artifacts["price_matrix"], reference_date=scraped_at.date())
+        written["price_matrix"] = append_artifact("price_matrix", route, df, scraped_at, root)
+
+    if "listings" in artifacts:
+        with open(artifacts["listings"], "r", encoding="utf-8") as f:
+            df = pd.DataFrame(json.load(f))
+        written["listings"] = append_artifact("listings", route, df, scraped_at, root)
+
+    return written
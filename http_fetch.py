@@ -0,0 +1,106 @@
+# Pooled HTTP session with a per-URL response cache (TTL plus conditional revalidation)
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (5, 20)
+DEFAULT_TTL = float(os.environ.get("HTTP_CACHE_TTL", 300))
+DEFAULT_MAX_ENTRIES = 128
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "en-AU,en;q=0.9",
+}
+
+
+# Function to build a session that keeps connections alive and retries transient failures
+def create_session(pool_size=20):
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class CachedFetcher:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, timeout=DEFAULT_TIMEOUT, session=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.session = session or create_session()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0}
+
+    # Return the page body for url, from cache while fresh, revalidating with ETag/Last-Modified once stale
+    def fetch(self, url):
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None:
+                self._cache.move_to_end(url)
+                if time.monotonic() - entry["fetched_at"] < self.ttl:
+                    self._stats["fresh_hits"] += 1
+                    return entry["text"]
+
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        with self._lock:
+            if response.status_code == 304 and entry is not None:
+                entry["fetched_at"] = time.monotonic()
+                self._stats["revalidated"] += 1
+                return entry["text"]
+
+            response.raise_for_status()
+            self._stats["misses"] += 1
+            self._cache[url] = {
+                "text": response.text,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.monotonic(),
+            }
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            return response.text
+
+    def invalidate(self, url=None):
+        with self._lock:
+            if url is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(url, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._cache))
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+# Function to get the process-wide fetcher
+def get_fetcher():
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = CachedFetcher()
+        return _fetcher
+
+
+def fetch_page(url):
+    return get_fetcher().fetch(url)
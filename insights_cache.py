@@ -0,0 +1,80 @@
+# Disk-backed cache of AI insights keyed by the data summary and model, with a TTL and LRU eviction
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+DEFAULT_PATH = os.environ.get("INSIGHTS_CACHE_PATH", "insights_cache.db")
+DEFAULT_TTL = float(os.environ.get("INSIGHTS_CACHE_TTL", 24 * 60 * 60))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("INSIGHTS_CACHE_SIZE", 256))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS insights (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    insights TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS insights_accessed ON insights (accessed_at);
+"""
+
+
+# Function to hash a summary and model name into a stable key; key order does not change it. Dict keys are
+# normalised to str first, because json.dumps rejects numpy keys (default=str only covers values)
+def insights_key(data_summary, model_name):
+    payload = json.dumps(str_keys(data_summary), sort_keys=True, default=str)
+    return hashlib.sha256(f"{model_name}\n{payload}".encode("utf-8")).hexdigest()
+
+
+# Function to turn every dict key in a nested summary into a str, as JSON would
+def str_keys(value):
+    if isinstance(value, dict):
+        return {str(key): str_keys(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [str_keys(item) for item in value]
+    return value
+
+
+class InsightsCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Stored insights for a key, or None if missing or older than the TTL
+    def get(self, key):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT insights, created_at FROM insights WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl:
+                conn.execute("DELETE FROM insights WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE insights SET accessed_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    # Store insights and evict the least recently used entries beyond max_entries
+    def put(self, key, model_name, insights):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO insights (key, model, insights, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, insights, now, now),
+            )
+            conn.execute(
+                "DELETE FROM insights WHERE key NOT IN (SELECT key FROM insights ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM insights")
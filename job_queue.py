@@ -0,0 +1,233 @@
+# Background job queue so /submit can return immediately while searches run on a bounded worker pool
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from result_cache import materialize, search_key
+from waits import LatencyBudget, ScrapeCancelled, ScrapeTimeout
+from metrics import metrics
+from date_grid_sweep import SWEEP_LATENCY_BUDGET, is_sweep
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+# cancel() result for a token that is not (or no longer) attached to the job
+UNKNOWN_WAITER = "unknown_waiter"
+
+
+# Function to run a search through the pipeline; imported on first use so the queue can be created without Selenium
+def run_search(**kwargs):
+    from pipeline import run_search as run_pipeline_search
+    return run_pipeline_search(**kwargs)
+
+
+class JobQueue:
+    def __init__(self, workers=2, output_root="jobs", max_finished=200, runner=None, cache=None):
+        self.output_root = output_root
+        self.cache = cache
+        self.max_finished = max_finished
+        self.runner = runner or run_search
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        # Signalled whenever a job publishes an event, so streaming clients wake up
+        self._changed = threading.Condition(self._lock)
+        # Normalised search -> id of the job currently scraping it, so identical requests share one scrape
+        self._inflight = {}
+
+    # Queue a search and return (job id, waiter token) straight away; a cached result finishes the job on
+    # the spot, and a search identical to one already queued or running joins that job instead of starting
+    # a scrape. The waiter token identifies this submitter when it cancels
+    def submit(self, search, use_cache=True):
+        key = search_key(search)
+        waiter = uuid.uuid4().hex
+        metrics.increment("jobs_submitted")
+        with self._lock:
+            leader = self._join_inflight(key, waiter)
+        if leader is not None:
+            return leader, waiter
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "search": search,
+            "output_dir": os.path.join(self.output_root, job_id),
+            "submitted_at": datetime.now().isoformat(timespec="seconds"),
+            "started_at": None,
+            "finished_at": None,
+            "url": None,
+            "artifacts": {},
+            "error": None,
+            "stage": None,
+            "from_cache": False,
+            "timings": [],
+            "waiters": 1,
+        }
+        cancel_event = threading.Event()
+
+        cached = self.cache.get(search) if self.cache is not None and use_cache else None
+        artifacts = materialize(cached, job["output_dir"]) if cached is not None else None
+
+        with self._lock:
+            # Another request may have started the same search while the cache was checked
+            leader = self._join_inflight(key, waiter) if cached is None else None
+            if leader is not None:
+                return leader, waiter
+            self._jobs[job_id] = {"job": job, "cancel": cancel_event, "future": None, "queued_at": time.monotonic(),
+                                  "events": [], "key": key, "waiters": {waiter}}
+            if cached is not None:
+                job.update(url=cached["url"], artifacts=artifacts, from_cache=True, started_at=job["submitted_at"])
+                self._finish(job, DONE)
+            else:
+                self._inflight[key] = job_id
+                self._emit(job_id, "status", self._snapshot(job))
+            self._evict_finished()
+        if cached is not None:
+            metrics.increment("jobs_from_cache")
+            return job_id, waiter
+
+        metrics.increment("scrapes_started")
+
+        future = self._executor.submit(self._run, job_id, search, cancel_event)
+        with self._lock:
+            self._jobs[job_id]["future"] = future
+        return job_id, waiter
+
+    # Snapshot of a job's status, or None if the id is unknown
+    def get(self, job_id):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            return self._snapshot(entry["job"]) if entry else None
+
+    # Events a job published after event id `after`, waiting up to `timeout` seconds for one to arrive.
+    # Returns (events, finished); an unknown or evicted job gives (None, True)
+    def events(self, job_id, after=0, timeout=15):
+        with self._changed:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None, True
+            self._changed.wait_for(
+                lambda: len(entry["events"]) > after or entry["job"]["status"] in FINISHED_STATES, timeout)
+            return entry["events"][after:], entry["job"]["status"] in FINISHED_STATES
+
+    # Withdraw one submitter from a job; queued jobs never start, running jobs stop at their next wait.
+    # Returns None for an unknown job, False once it finished, UNKNOWN_WAITER for a token that is not
+    # attached to it, and True when the withdrawal was recorded
+    def cancel(self, job_id, waiter):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None
+            job = entry["job"]
+            if job["status"] in FINISHED_STATES:
+                return False
+            # Each token withdraws once, so a repeated cancel cannot stop a scrape other requests still want
+            if waiter not in entry["waiters"]:
+                return UNKNOWN_WAITER
+            entry["waiters"].discard(waiter)
+            job["waiters"] = len(entry["waiters"])
+            # A shared scrape only stops once every request attached to it has cancelled
+            if entry["waiters"]:
+                return True
+            self._release_inflight(entry)
+            entry["cancel"].set()
+            if job["status"] == QUEUED and entry["future"] is not None and entry["future"].cancel():
+                self._finish(job, CANCELLED, error="Cancelled before start")
+            return True
+
+    def jobs(self):
+        with self._lock:
+            return [dict(entry["job"]) for entry in self._jobs.values()]
+
+    def _run(self, job_id, search, cancel_event):
+        with self._lock:
+            job = self._jobs[job_id]["job"]
+            metrics.observe("queue_wait", time.monotonic() - self._jobs[job_id]["queued_at"])
+            if cancel_event.is_set():
+                self._finish(job, CANCELLED, error="Cancelled before start")
+                return
+            job["status"] = RUNNING
+            job["started_at"] = datetime.now().isoformat(timespec="seconds")
+            self._emit(job_id, "status", self._snapshot(job))
+
+        # Partial results (price history, grid cells, listings) are published as each stage produces them
+        def on_progress(kind, data):
+            with self._lock:
+                self._emit(job_id, kind, data)
+
+        try:
+            # Every stage span of this search is kept on the job, so /jobs/<id> shows where its time went
+            with metrics.trace() as timings, metrics.span("search_total"):
+                job["timings"] = timings
+                # A date-grid sweep pages many windows, so it gets the larger sweep budget
+                budget = LatencyBudget(total_seconds=SWEEP_LATENCY_BUDGET if is_sweep(search) else None, cancel_event=cancel_event)
+                outcome = self.runner(output_dir=job["output_dir"], budget=budget, on_progress=on_progress, **search)
+            if self.cache is not None:
+                self.cache.put(search, outcome["url"], outcome["artifacts"])
+            with self._lock:
+                job.update(url=outcome["url"], artifacts=outcome["artifacts"])
+                self._finish(job, DONE)
+        except ScrapeCancelled as e:
+            with self._lock:
+                self._finish(job, CANCELLED, error=str(e), stage=e.stage)
+        except ScrapeTimeout as e:
+            with self._lock:
+                self._finish(job, FAILED, error=str(e), stage=e.stage)
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self._finish(job, FAILED, error=str(e))
+
+    # Attach a waiter to the in-flight job for a search key, returning its id, or None if there is none; lock held
+    def _join_inflight(self, key, waiter):
+        job_id = self._inflight.get(key)
+        if job_id is None:
+            return None
+        entry = self._jobs[job_id]
+        entry["waiters"].add(waiter)
+        entry["job"]["waiters"] = len(entry["waiters"])
+        metrics.increment("jobs_coalesced")
+        return job_id
+
+    def _release_inflight(self, entry):
+        if self._inflight.get(entry.get("key")) == entry["job"]["job_id"]:
+            del self._inflight[entry["key"]]
+
+    def _finish(self, job, status, error=None, stage=None):
+        self._release_inflight(self._jobs[job["job_id"]])
+        job["status"] = status
+        job["error"] = error
+        job["stage"] = stage
+        job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        self._emit(job["job_id"], "status", self._snapshot(job))
+
+    # Append an event to a job's log and wake its streaming clients; called with the lock held
+    def _emit(self, job_id, kind, data):
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return
+        entry["events"].append({"id": len(entry["events"]) + 1, "event": kind, "data": data})
+        self._changed.notify_all()
+
+    @staticmethod
+    def _snapshot(job):
+        job = dict(job)
+        job["timings"] = list(job["timings"])
+        return job
+
+    # Forget the oldest finished jobs (and their files) beyond max_finished
+    def _evict_finished(self):
+        finished = [job_id for job_id, entry in self._jobs.items() if entry["job"]["status"] in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            entry = self._jobs.pop(job_id)
+            shutil.rmtree(entry["job"]["output_dir"], ignore_errors=True)
@@ -0,0 +1,165 @@
+# Timing spans for every pipeline stage, aggregated into latency histograms for the /metrics endpoint
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds, ok=True):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.errors += not ok
+        self.sum += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    # Estimate a quantile by interpolating inside the bucket that holds it
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / n
+                # Never report outside what was actually observed
+                return round(min(max(estimate, self.min), self.max), 4)
+            seen += n
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_seconds": round(self.sum, 4),
+            "mean_seconds": round(self.sum / self.count, 4) if self.count else None,
+            "min_seconds": None if self.min is None else round(self.min, 4),
+            "max_seconds": None if self.max is None else round(self.max, 4),
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+        }
+
+
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # Record one finished stage, in the histograms and in the current thread's trace if one is open
+    def observe(self, stage, seconds, ok=True):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds, ok)
+        spans = getattr(self._local, "spans", None)
+        if spans is not None:
+            spans.append({"stage": stage, "seconds": round(seconds, 4), "status": "ok" if ok else "error"})
+
+    # Count an event such as a coalesced request
+    def increment(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    # Time a block as one stage; an exception marks the span as an error and is re-raised
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - started, ok=False)
+            raise
+        self.observe(stage, time.perf_counter() - started)
+
+    # Collect every span recorded on this thread while the block runs, e.g. the timings of one job
+    @contextmanager
+    def trace(self):
+        previous = getattr(self._local, "spans", None)
+        self._local.spans = spans = []
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+            if previous is not None:
+                previous.extend(spans)
+
+    # Time a linear sequence of stages: each enter_stage() call inside the block closes the previous one.
+    # The stage still open when the block exits is recorded as an error if an exception escaped
+    @contextmanager
+    def stage_sequence(self):
+        previous = getattr(self._local, "sequence", None)
+        self._local.sequence = sequence = {"stage": None, "started": None}
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._close_stage(sequence, ok)
+            self._local.sequence = previous
+
+    def enter_stage(self, stage):
+        sequence = getattr(self._local, "sequence", None)
+        if sequence is None:
+            return
+        self._close_stage(sequence, True)
+        sequence.update(stage=stage, started=time.perf_counter())
+
+    def _close_stage(self, sequence, ok):
+        if sequence["stage"] is not None:
+            self.observe(sequence["stage"], time.perf_counter() - sequence["started"], ok)
+            sequence["stage"] = None
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {stage: histogram.summary() for stage, histogram in sorted(self._histograms.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    # Prometheus text exposition of every stage histogram
+    def to_prometheus(self, name="scrape_stage_seconds"):
+        lines = [f"# HELP {name} Duration of each scrape pipeline stage in seconds.", f"# TYPE {name} histogram"]
+        errors = [f"# HELP {name}_errors_total Stage runs that ended in an exception.", f"# TYPE {name}_errors_total counter"]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+                errors.append(f'{name}_errors_total{{stage="{stage}"}} {histogram.errors}')
+            counters = []
+            for counter, value in sorted(self._counters.items()):
+                counters += [f"# TYPE {counter}_total counter", f"{counter}_total {value}"]
+        return "\n".join(lines + errors + counters) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# Process-wide registry shared by the scrapers, the job queue and the Flask app
+metrics = Metrics()
+span = metrics.span
+enter_stage = metrics.enter_stage
@@ -0,0 +1,52 @@
+# Incremental extraction of the one-way price grid while it is paged forward
+from bisect import bisect_left
+
+from grid_dates import parse_grid_date
+
+
+class OneWayGridPager:
+    def __init__(self, reference_date, horizon_date=None):
+        self.reference_date = reference_date
+        self.horizon_date = horizon_date
+        self.seen_columns = set()
+        self.latest_date = None
+
+    # Process one extraction of the grid, returning rows only for columns not seen on earlier pages
+    def ingest(self, columns):
+        headers = [h for h in columns["headers"] if h["date"] not in self.seen_columns]
+        if not headers:
+            return []
+
+        # Sorted offsets let each price find its nearest header by binary search
+        index = sorted(columns["headers"], key=lambda h: h["x_offset"])
+        offsets = [h["x_offset"] for h in index]
+        new_dates = {h["date"] for h in headers}
+
+        rows = []
+        for price in columns["prices"]:
+            header = self._nearest(index, offsets, price["x_offset"])
+            if header is not None and header["date"] in new_dates:
+                rows.append({"Day": header["day"], "Date": header["date"], "Price": price["price"]})
+
+        for header in headers:
+            self.seen_columns.add(header["date"])
+            parsed = parse_grid_date(header["date"], self.reference_date)
+            if parsed and (self.latest_date is None or parsed > self.latest_date):
+                self.latest_date = parsed
+        return rows
+
+    # True once the grid has revealed a column on or after the horizon date
+    def covered(self):
+        return self.horizon_date is not None and self.latest_date is not None and self.latest_date >= self.horizon_date
+
+    @staticmethod
+    def _nearest(index, offsets, x_offset):
+        if x_offset is None or not index:
+            return None
+        i = bisect_left(offsets, x_offset)
+        if i == 0:
+            return index[0]
+        if i == len(offsets):
+            return index[-1]
+        before, after = index[i - 1], index[i]
+        return before if x_offset - before["x_offset"] <= after["x_offset"] - x_offset else after
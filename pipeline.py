@@ -0,0 +1,54 @@
+# End-to-end scrape of one search: Selenium price data followed by the airline listings
+import os
+
+from scrapper1 import data_scrapper
+from scrapper2 import airline_data
+from history_store import record_search
+from fare_store import route_key
+from snapshots import DEFAULT_CAPTURE_DIR
+from metrics import span
+from waits import LatencyBudget
+from date_grid_sweep import SWEEP_LATENCY_BUDGET
+
+# Files a search can produce inside its output directory
+ARTIFACT_FILES = {
+    "price_history": "price_history_data.csv",
+    "price_matrix": "flight_price_matrix.csv",
+    "one_way_prices": "accurate_flight_prices.csv",
+    "listings": "google_flights_data.json",
+}
+
+
+# Function to list the artifacts a finished search left in its output directory
+def collect_artifacts(output_dir):
+    artifacts = {}
+    for name, filename in ARTIFACT_FILES.items():
+        path = os.path.join(output_dir, filename)
+        if os.path.exists(path):
+            artifacts[name] = path
+    return artifacts
+
+
+# Function to run one search and keep everything it writes inside output_dir.
+# With a capture_dir the raw price graph, date grid and listings HTML are also stored for offline re-parsing,
+# and on_progress(kind, data) is called as soon as each artifact has been written
+def run_search(source, destination, departure, trip_type="Round Trip", arrival=None, output_dir=".", budget=None, capture_dir=DEFAULT_CAPTURE_DIR, on_progress=None, departure_until=None, return_until=None):
+    os.makedirs(output_dir, exist_ok=True)
+    if budget is None and (departure_until or return_until):
+        budget = LatencyBudget(total_seconds=SWEEP_LATENCY_BUDGET)
+
+    current_url = data_scrapper(source, destination, departure, trip_type=trip_type, arrival=arrival, budget=budget, output_dir=output_dir, capture_dir=capture_dir, on_progress=on_progress, departure_until=departure_until, return_until=return_until)
+    if budget is not None:
+        budget.check_cancelled("listings")
+    airline_data(current_url, output_dir=output_dir, capture_dir=capture_dir, route=route_key(source, destination), on_progress=on_progress)
+    artifacts = collect_artifacts(output_dir)
+
+    # Keep a permanent copy in the history store; a failure here must not fail the search
+    search = {"source": source, "destination": destination}
+    try:
+        with span("processing"):
+            record_search(search, artifacts)
+    except Exception as e:
+        print("Error recording scrape history:", e)
+
+    return {"url": current_url, "output_dir": output_dir, "artifacts": artifacts}
@@ -0,0 +1,124 @@
+# Per-route daily price series merged from every price history scrape, with rolling statistics kept up to date
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, timedelta
+
+import pandas as pd
+
+DEFAULT_PATH = os.environ.get("PRICE_SERIES_PATH", "price_series.db")
+DEFAULT_WINDOW = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    route TEXT NOT NULL, day TEXT NOT NULL, price REAL NOT NULL,
+    PRIMARY KEY (route, day)
+);
+CREATE TABLE IF NOT EXISTS rolling (
+    route TEXT NOT NULL, day TEXT NOT NULL,
+    min REAL, max REAL, mean REAL, volatility REAL, count INTEGER,
+    PRIMARY KEY (route, day)
+);
+CREATE TABLE IF NOT EXISTS weekly (
+    route TEXT NOT NULL, week TEXT NOT NULL,
+    min REAL, max REAL, mean REAL, count INTEGER,
+    PRIMARY KEY (route, week)
+);
+"""
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+# Function to compute min/max/mean/volatility over the `window` calendar days ending at `day`
+def window_stats(prices, day, window):
+    values = [prices[d] for d in (day - timedelta(days=k) for k in range(window)) if d in prices]
+    count = len(values)
+    mean = sum(values) / count
+    variance = sum((v - mean) ** 2 for v in values) / (count - 1) if count > 1 else 0.0
+    return (min(values), max(values), mean, variance ** 0.5, count)
+
+
+# Function to compute min/max/mean over the Monday-to-Sunday week starting at `week`
+def week_stats(prices, week):
+    values = [prices[d] for d in (week + timedelta(days=k) for k in range(7)) if d in prices]
+    return (min(values), max(values), sum(values) / len(values), len(values))
+
+
+class PriceSeriesStore:
+    def __init__(self, path=DEFAULT_PATH, window=DEFAULT_WINDOW):
+        self.path = path
+        self.window = window
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Merge a parsed price history scrape (Date/Price columns) into the route's series.
+    # Overlapping days take the newest price, and only the rolling windows and weeks touched by a
+    # changed day are recomputed, so an append reads and writes O(window) rows whatever the history length
+    def append(self, route, df):
+        points = {pd.Timestamp(d).date(): float(p) for d, p in zip(df["Date"], df["Price"])}
+        if not points:
+            return 0
+
+        span = max(self.window, 7)
+        low = min(points) - timedelta(days=span)
+        high = max(points) + timedelta(days=span)
+
+        with closing(self._connect()) as conn, conn:
+            prices = {
+                date.fromisoformat(day): price
+                for day, price in conn.execute(
+                    "SELECT day, price FROM prices WHERE route = ? AND day BETWEEN ? AND ?",
+                    (route, low.isoformat(), high.isoformat()),
+                )
+            }
+
+            changed = [day for day, price in points.items() if prices.get(day) != price]
+            if not changed:
+                return 0
+            for day in changed:
+                prices[day] = points[day]
+            conn.executemany(
+                "INSERT OR REPLACE INTO prices (route, day, price) VALUES (?, ?, ?)",
+                [(route, day.isoformat(), prices[day]) for day in changed],
+            )
+
+            affected = {
+                day + timedelta(days=k)
+                for day in changed for k in range(self.window)
+                if day + timedelta(days=k) in prices
+            }
+            conn.executemany(
+                "INSERT OR REPLACE INTO rolling (route, day, min, max, mean, volatility, count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(route, day.isoformat()) + window_stats(prices, day, self.window) for day in affected],
+            )
+
+            weeks = {_week_start(day) for day in changed}
+            conn.executemany(
+                "INSERT OR REPLACE INTO weekly (route, week, min, max, mean, count) VALUES (?, ?, ?, ?, ?, ?)",
+                [(route, week.isoformat()) + week_stats(prices, week) for week in weeks],
+            )
+            return len(changed)
+
+    # Precomputed daily (price + rolling stats) or weekly rows between start and end, read by index range
+    def trend(self, route, start=None, end=None, resolution="daily"):
+        start = pd.Timestamp(start).date().isoformat() if start is not None else "0000-01-01"
+        end = pd.Timestamp(end).date().isoformat() if end is not None else "9999-12-31"
+
+        if resolution == "weekly":
+            query = ("SELECT week AS Date, min, max, mean, count FROM weekly "
+                     "WHERE route = ? AND week BETWEEN ? AND ? ORDER BY week")
+        else:
+            query = ("SELECT p.day AS Date, p.price AS Price, r.min, r.max, r.mean, r.volatility, r.count "
+                     "FROM prices p JOIN rolling r ON r.route = p.route AND r.day = p.day "
+                     "WHERE p.route = ? AND p.day BETWEEN ? AND ? ORDER BY p.day")
+
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(query, conn, params=(route, start, end))
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df
@@ -1,72 +1,144 @@
+import os
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import streamlit as st
-import plotly.express as px
+from datetime import datetime
+from fare_store import FareStore
+from grid_dates import parse_grid_dates
+from flight_stats import compute_flight_aggregates, format_stats_table
+from chart_render import line_chart, scatter_chart, box_chart
 
+# Streamlit, Plotly and pyarrow are imported inside the functions that draw or read history,
+# so the parsing functions can be used by the backend and benchmarks without loading them
 
 
-def process_price_history(PRICE_HISTORY_PATH):
-    # Load original CSV
-    df_raw = pd.read_csv(PRICE_HISTORY_PATH)
+# "Today - A$123" / "12 days ago - A$456": a day count (or Today) and the price after " - "
+HISTORY_LABEL_PATTERN = r'^(?:(?P<Today>Today)|(?P<Days>\d+)(?:\s[^-]*)?)\s+-\s+(?:A\$)?(?P<Price>\d[\d,]*)$'
 
-    today = datetime.today()
-    parsed_data = []
 
-    for row in df_raw['aria-label']:
-        try:
-            day_part, price_part = row.split(" - ")
-            if day_part.strip() == "Today":
-                date = today
-            else:
-                num_days = int(day_part.split()[0])
-                date = today - timedelta(days=num_days)
+def parse_price_history_labels(labels, reference_date):
+    # A scrape repeats the same few labels, so each distinct label is parsed once with one regex
+    # and the results are broadcast back to every row by category code
+    labels = pd.Series(labels)
+    if not isinstance(labels.dtype, pd.CategoricalDtype):
+        labels = labels.astype("category")
+    codes = labels.cat.codes.to_numpy()
+    parts = pd.Series(labels.cat.categories, dtype="string").str.strip().str.extract(HISTORY_LABEL_PATTERN)
 
-            price = int(price_part.replace("A$", "").replace(",", ""))
-            parsed_data.append({"Date": date.date(), "Price": price})
-        except:
-            continue  # Skip invalid rows
+    days = pd.to_numeric(parts["Days"], errors="coerce").where(parts["Today"].isna(), 0)
+    prices = pd.to_numeric(parts["Price"].str.replace(",", "", regex=False), errors="coerce")
+    # A trailing NaN lets missing labels (code -1) index straight into "unparsed"
+    num_days = np.append(days.to_numpy(dtype="float64", na_value=np.nan), np.nan)[codes]
+    price = np.append(prices.to_numpy(dtype="float64", na_value=np.nan), np.nan)[codes]
 
-    # Convert to DataFrame
-    df = pd.DataFrame(parsed_data)
-    df.sort_values("Date", inplace=True)
-    df.to_csv(PRICE_HISTORY_PATH, index=False)
+    # Rows that do not fit the label format are reported, not silently dropped
+    valid = ~np.isnan(num_days) & ~np.isnan(price)
+    malformed = pd.DataFrame({"row": labels.index[~valid], "aria-label": labels[~valid].astype("string")}).reset_index(drop=True)
+
+    reference = pd.Timestamp(reference_date).normalize()
+    df = pd.DataFrame({
+        "Date": reference - pd.to_timedelta(num_days[valid].astype("int64"), unit="D"),
+        "Price": price[valid].astype("int64"),
+    })
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    return df, malformed
+
+
+def process_price_history(PRICE_HISTORY_PATH, reference_date=None):
+    # Load original CSV; it is left untouched
+    df_raw = pd.read_csv(PRICE_HISTORY_PATH, usecols=['aria-label'], dtype={'aria-label': 'category'})
+
+    # Labels are relative to the day of the scrape, which defaults to when the file was written
+    if reference_date is None:
+        reference_date = datetime.fromtimestamp(os.path.getmtime(PRICE_HISTORY_PATH)).date()
+
+    df, malformed = parse_price_history_labels(df_raw['aria-label'], reference_date)
+    if len(malformed):
+        print(f"Skipped {len(malformed)} malformed price history rows in {PRICE_HISTORY_PATH}")
+    df.attrs["malformed_rows"] = malformed
     return df
 
 
+def load_one_way_fares(route=None, since=None, store=None):
+    # Read stored one-way fares through the indexed store instead of scanning a CSV
+    store = store or FareStore()
+    df = pd.DataFrame(store.fares(route=route, since=since), columns=['route', 'day', 'date', 'price', 'scrape_date', 'scraped_at'])
+    df = df.rename(columns={'day': 'Day', 'date': 'Date', 'price': 'Price'})
+    df['Price_Numeric'] = pd.to_numeric(df['Price'].str.replace('A$', '', regex=False).str.replace(',', '', regex=False), errors='coerce')
+    df['scrape_date'] = pd.to_datetime(df['scrape_date'])
+    return df
 
 
-def load_and_clean_data(csv_file_path):
-    # Read the CSV file
-    df = pd.read_csv(csv_file_path)
-    
-    # Clean the price column - remove 'A$' and convert to numeric
-    df['Price_Numeric'] = df['Price'].str.replace('A$', '').astype(float)
-    
-    # Parse the dates and extract departure and return dates
-    df['Departure_Date'] = df['Dates'].str.extract(r'(\w+ \d+)')
-    df['Return_Date'] = df['Dates'].str.extract(r'to (\w+ \d+)')
-    
-    # Convert to datetime (assuming 2025 year)
-    df['Departure_Date'] = pd.to_datetime(df['Departure_Date'] + ' 2025')
-    df['Return_Date'] = pd.to_datetime(df['Return_Date'] + ' 2025')
-    
+def load_price_matrix_history(routes=None, start_date=None, end_date=None, columns=None):
+    # Cleaned price matrices from the history store, reading only the needed columns and partitions
+    from history_store import read_artifact
+    return read_artifact('price_matrix', columns=columns, routes=routes, start_date=start_date, end_date=end_date)
+
+
+def load_price_history_series(routes=None, start_date=None, end_date=None, columns=None):
+    # Parsed price history points from the history store
+    from history_store import read_artifact
+    return read_artifact('price_history', columns=columns, routes=routes, start_date=start_date, end_date=end_date)
+
+
+# One pass over the Dates text pulls out both dates, the price category and the selected flag
+DATES_PATTERN = (
+    r'^(?=(?:.*?(?P<Price_Category>cheapest price|low price))?)'
+    r'(?=(?P<Is_Selected>.*?selected)?)'
+    r'.*?(?P<Departure_Date>\w+ \d+).*?to (?P<Return_Date>\w+ \d+)'
+)
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PRICE_CATEGORIES = ['cheapest price', 'low price', 'regular price']
+
+
+def load_and_clean_data(csv_file_path, reference_date=None):
+    # Read the CSV file; repeated strings are stored once as categories
+    df = pd.read_csv(csv_file_path, usecols=['Price', 'Dates'], dtype={'Price': 'category', 'Dates': 'category'})
+
+    # The grid shows dates from the day of the scrape onwards, which defaults to when the file was written
+    if reference_date is None:
+        reference_date = datetime.fromtimestamp(os.path.getmtime(csv_file_path)).date()
+    reference = pd.Timestamp(reference_date).normalize()
+
+    # Clean the price column - remove 'A$' and convert to a compact numeric, once per distinct price
+    prices = df['Price'].cat
+    price_values = pd.Series(prices.categories, dtype=object).str.replace('A$', '', regex=False).str.replace(',', '', regex=False)
+    price_values = pd.to_numeric(price_values, errors='coerce').astype('float32')
+    df['Price_Numeric'] = price_values.reindex(prices.codes).to_numpy()
+
+    # Parse the dates, price category and selected flag in a single pass over the distinct Dates strings
+    dates = df['Dates'].cat
+    parsed = pd.Series(dates.categories, dtype=object).str.extract(DATES_PATTERN)
+
+    # Dates carry no year: departures are resolved from the scrape date, returns from their departure
+    departure = parse_grid_dates(parsed['Departure_Date'], reference)
+    returning = parse_grid_dates(parsed['Return_Date'], departure)
+    parsed['Departure_Date'] = departure
+    parsed['Return_Date'] = returning
+
+    # Broadcast the per-string results back to every row
+    rows = parsed.reindex(dates.codes)
+    df['Departure_Date'] = rows['Departure_Date'].to_numpy()
+    df['Return_Date'] = rows['Return_Date'].to_numpy()
+
     # Calculate trip duration
-    df['Trip_Duration'] = (df['Return_Date'] - df['Departure_Date']).dt.days
-    
+    df['Trip_Duration'] = (df['Return_Date'] - df['Departure_Date']).dt.days.astype('Int16')
+
     # Extract price category
-    df['Price_Category'] = df['Dates'].str.extract(r'(cheapest price|low price)')
-    df['Price_Category'] = df['Price_Category'].fillna('regular price')
-    
+    df['Price_Category'] = pd.Categorical(rows['Price_Category'].fillna('regular price').to_numpy(), categories=PRICE_CATEGORIES)
+
     # Add day of week for departure and return
-    df['Departure_Day'] = df['Departure_Date'].dt.day_name()
-    df['Return_Day'] = df['Return_Date'].dt.day_name()
-    
+    df['Departure_Day'] = pd.Categorical(df['Departure_Date'].dt.day_name(), categories=WEEKDAYS, ordered=True)
+    df['Return_Day'] = pd.Categorical(df['Return_Date'].dt.day_name(), categories=WEEKDAYS, ordered=True)
+
     # Check if it's selected
-    df['Is_Selected'] = df['Dates'].str.contains('selected', na=False)
-    
+    df['Is_Selected'] = rows['Is_Selected'].notna().to_numpy()
+
     return df
 
 def display_price_matrix(df):
+    import streamlit as st
+    import plotly.express as px
+
     st.subheader("Flight Price Matrix")
     
     # Create pivot table for the matrix
@@ -74,7 +146,8 @@ def display_price_matrix(df):
         values='Price_Numeric', 
         index='Departure_Day', 
         columns='Return_Day', 
-        aggfunc='mean'
+        aggfunc='mean',
+        observed=True
     )
     
     # Create heatmap
@@ -98,44 +171,102 @@ def display_price_matrix(df):
     
     # Display raw data with formatting
     st.subheader("Detailed Price Data")
-    
-    # Format the dataframe for display
-    display_df = df[['Departure_Date', 'Return_Date', 'Price', 'Trip_Duration', 'Price_Category', 'Is_Selected']].copy()
-    display_df['Departure_Date'] = display_df['Departure_Date'].dt.strftime('%Y-%m-%d')
-    display_df['Return_Date'] = display_df['Return_Date'].dt.strftime('%Y-%m-%d')
-    
-    # Color code the selected row
-    def highlight_selected(row):
-        return ['background-color: lightgreen' if row['Is_Selected'] else '' for _ in row]
-    
-    styled_df = display_df.style.apply(highlight_selected, axis=1)
-    st.dataframe(styled_df, use_container_width=True)
 
-def analyze_flight_statistics(df):
+    # Sorting, filtering and paging happen here; only the visible page is formatted, styled and sent
+    columns = st.columns([2, 2, 1, 1, 1])
+    with columns[0]:
+        categories = st.multiselect("Price Category", list(df['Price_Category'].cat.categories), key="matrix_categories")
+    with columns[1]:
+        sort_by = st.selectbox("Sort by", PRICE_TABLE_SORT_COLUMNS, key="matrix_sort_by")
+    with columns[2]:
+        ascending = st.toggle("Ascending", value=True, key="matrix_ascending")
+    with columns[3]:
+        page_size = st.selectbox("Rows", PRICE_TABLE_PAGE_SIZES, key="matrix_page_size")
+
+    total = len(filter_price_table(df, categories))
+    pages = max(1, -(-total // page_size))
+    # The page lives only in session state, so the widget gets no default of its own;
+    # a narrower filter can leave the remembered page past the end
+    if "matrix_page" not in st.session_state:
+        st.session_state.matrix_page = 1
+    elif st.session_state.matrix_page > pages:
+        st.session_state.matrix_page = pages
+    with columns[4]:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key="matrix_page")
+
+    page_df = price_table_page(df, sort_by, ascending, categories, page, page_size)
+    st.dataframe(style_price_table(page_df), use_container_width=True, hide_index=True)
+    st.caption(f"Showing {len(page_df)} of {total} rows (page {page} of {pages})")
+
+
+PRICE_TABLE_COLUMNS = ['Departure_Date', 'Return_Date', 'Price', 'Trip_Duration', 'Price_Category', 'Is_Selected']
+PRICE_TABLE_SORT_COLUMNS = ['Price_Numeric', 'Departure_Date', 'Return_Date', 'Trip_Duration']
+PRICE_TABLE_PAGE_SIZES = [25, 50, 100, 250]
+
+
+# Function to keep only the rows in the chosen price categories (all rows when none are chosen)
+def filter_price_table(df, categories=None):
+    if not categories:
+        return df
+    return df[df['Price_Category'].isin(categories)]
+
+
+# Function to select one page of the price table; the sort is an argsort of one column, and the date
+# formatting runs on the page rows only
+def price_table_page(df, sort_by='Price_Numeric', ascending=True, categories=None, page=1, page_size=50):
+    filtered = filter_price_table(df, categories)
+    values = filtered[sort_by]
+    if pd.api.types.is_numeric_dtype(values):
+        values = values.to_numpy(dtype='float64', na_value=np.nan)
+    order = np.asarray(values).argsort(kind='stable')
+    if not ascending:
+        order = order[::-1]
+    start = (page - 1) * page_size
+    rows = filtered.iloc[order[start:start + page_size]]
+
+    page_df = rows[PRICE_TABLE_COLUMNS].copy()
+    page_df['Departure_Date'] = page_df['Departure_Date'].dt.strftime('%Y-%m-%d')
+    page_df['Return_Date'] = page_df['Return_Date'].dt.strftime('%Y-%m-%d')
+    return page_df
+
+
+# Function to colour the selected row with one whole-frame style pass instead of a per-row callback
+def style_price_table(page_df):
+    selected = page_df['Is_Selected'].fillna(False).astype(bool).to_numpy()
+    styles = pd.DataFrame('', index=page_df.index, columns=page_df.columns)
+    styles.loc[selected, :] = 'background-color: lightgreen'
+    return page_df.style.apply(lambda _: styles, axis=None)
+
+def analyze_flight_statistics(df, aggregates=None):
+    import streamlit as st
+
     st.header("Flight Price Analytics & Insights")
+
+    # All rollups come from the shared aggregation engine
+    if aggregates is None:
+        aggregates = compute_flight_aggregates(df)
+    overall = aggregates['overall']
     
     # Basic statistics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Cheapest Price", f"A${df['Price_Numeric'].min():.0f}")
+        st.metric("Cheapest Price", f"A${overall['min']:.0f}")
     with col2:
-        st.metric("Most Expensive", f"A${df['Price_Numeric'].max():.0f}")
+        st.metric("Most Expensive", f"A${overall['max']:.0f}")
     with col3:
-        st.metric("Average Price", f"A${df['Price_Numeric'].mean():.0f}")
+        st.metric("Average Price", f"A${overall['mean']:.0f}")
     with col4:
-        st.metric("Price Range", f"A${df['Price_Numeric'].max() - df['Price_Numeric'].min():.0f}")
+        st.metric("Price Range", f"A${overall['max'] - overall['min']:.0f}")
     
     # Day-wise analysis
     st.subheader("Day-wise Price Analysis")
     
     # Departure day analysis
-    dep_day_stats = df.groupby('Departure_Day')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2)
-    dep_day_stats.columns = ['Average Price', 'Minimum Price', 'Maximum Price', 'Count']
+    dep_day_stats = format_stats_table(aggregates['departure_day'])
     
     # Return day analysis
-    ret_day_stats = df.groupby('Return_Day')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2)
-    ret_day_stats.columns = ['Average Price', 'Minimum Price', 'Maximum Price', 'Count']
+    ret_day_stats = format_stats_table(aggregates['return_day'])
     
     col1, col2 = st.columns(2)
     
@@ -162,11 +293,10 @@ def analyze_flight_statistics(df):
     # Trip duration analysis
     st.subheader("Trip Duration Analysis")
     
-    duration_stats = df.groupby('Trip_Duration')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2)
-    duration_stats.columns = ['Average Price', 'Minimum Price', 'Maximum Price', 'Count']
+    duration_stats = format_stats_table(aggregates['duration'])
     
     # Plot duration vs price
-    fig = px.scatter(
+    fig = scatter_chart(
         df, 
         x='Trip_Duration', 
         y='Price_Numeric',
@@ -182,10 +312,9 @@ def analyze_flight_statistics(df):
     # Price category analysis
     st.subheader("Price Category Analysis")
     
-    category_stats = df.groupby('Price_Category')['Price_Numeric'].agg(['mean', 'min', 'max', 'count']).round(2)
-    category_stats.columns = ['Average Price', 'Minimum Price', 'Maximum Price', 'Count']
+    category_stats = format_stats_table(aggregates['category'])
     
-    fig = px.box(
+    fig = box_chart(
         df, 
         x='Price_Category', 
         y='Price_Numeric',
@@ -202,7 +331,7 @@ def analyze_flight_statistics(df):
     # Sort by departure date for trend analysis
     df_sorted = df.sort_values('Departure_Date')
     
-    fig = px.line(
+    fig = line_chart(
         df_sorted,
         x='Departure_Date',
         y='Price_Numeric',
@@ -218,22 +347,18 @@ def analyze_flight_statistics(df):
     insights = []
     
     # Find cheapest combination
-    cheapest_flight = df.loc[df['Price_Numeric'].idxmin()]
+    cheapest_flight = aggregates['cheapest']
     insights.append(f"🏆 **Cheapest Flight**: Depart {cheapest_flight['Departure_Day']}, Return {cheapest_flight['Return_Day']} - A${cheapest_flight['Price_Numeric']:.0f}")
     
     # Find most expensive combination
-    expensive_flight = df.loc[df['Price_Numeric'].idxmax()]
+    expensive_flight = aggregates['most_expensive']
     insights.append(f"💰 **Most Expensive**: Depart {expensive_flight['Departure_Day']}, Return {expensive_flight['Return_Day']} - A${expensive_flight['Price_Numeric']:.0f}")
     
     # Weekend vs weekday analysis
-    weekend_days = ['Saturday', 'Sunday']
-    weekend_flights = df[df['Departure_Day'].isin(weekend_days)]
-    weekday_flights = df[~df['Departure_Day'].isin(weekend_days)]
+    weekend_avg = aggregates['weekend_vs_weekday']['weekend_avg']
+    weekday_avg = aggregates['weekend_vs_weekday']['weekday_avg']
     
-    if len(weekend_flights) > 0 and len(weekday_flights) > 0:
-        weekend_avg = weekend_flights['Price_Numeric'].mean()
-        weekday_avg = weekday_flights['Price_Numeric'].mean()
-        
+    if weekend_avg is not None and weekday_avg is not None:
         if weekend_avg > weekday_avg:
             insights.append(f"📅 **Weekend Premium**: Weekend departures cost A${weekend_avg - weekday_avg:.0f} more on average")
         else:
@@ -244,7 +369,7 @@ def analyze_flight_statistics(df):
     insights.append(f"⏱️ **Best Value Duration**: {duration_stats.loc[duration_stats['Average Price'].idxmin()].name} days at A${best_duration['Average Price']:.0f} average")
     
     # Price volatility
-    price_volatility = df['Price_Numeric'].std()
+    price_volatility = overall['std']
     insights.append(f"📊 **Price Volatility**: Standard deviation of A${price_volatility:.0f} indicates {'high' if price_volatility > 100 else 'moderate'} price variation")
     
     for insight in insights:
@@ -258,18 +383,28 @@ def analyze_flight_statistics(df):
         'insights': insights
     }
 
-def create_price_comparison_chart(df):
+def create_price_comparison_chart(df, aggregates=None):
+    import streamlit as st
+    import plotly.express as px
+
     st.subheader("Interactive Price Comparison")
+
+    if aggregates is None:
+        aggregates = compute_flight_aggregates(df)
     
     # Allow user to select comparison type
     comparison_type = st.selectbox(
         "Compare prices by:",
         ["Departure Day", "Return Day", "Trip Duration", "Price Category"]
     )
+
+    # Average price per group, read from the precomputed rollup
+    def average_by(name, column):
+        return aggregates[name]['mean'].rename('Price_Numeric').rename_axis(column).reset_index()
     
     if comparison_type == "Departure Day":
         fig = px.bar(
-            df.groupby('Departure_Day')['Price_Numeric'].mean().reset_index(),
+            average_by('departure_day', 'Departure_Day'),
             x='Departure_Day',
             y='Price_Numeric',
             title="Average Price by Departure Day",
@@ -277,7 +412,7 @@ def create_price_comparison_chart(df):
         )
     elif comparison_type == "Return Day":
         fig = px.bar(
-            df.groupby('Return_Day')['Price_Numeric'].mean().reset_index(),
+            average_by('return_day', 'Return_Day'),
             x='Return_Day',
             y='Price_Numeric',
             title="Average Price by Return Day",
@@ -285,7 +420,7 @@ def create_price_comparison_chart(df):
         )
     elif comparison_type == "Trip Duration":
         fig = px.bar(
-            df.groupby('Trip_Duration')['Price_Numeric'].mean().reset_index(),
+            average_by('duration', 'Trip_Duration'),
             x='Trip_Duration',
             y='Price_Numeric',
             title="Average Price by Trip Duration",
@@ -293,11 +428,11 @@ def create_price_comparison_chart(df):
         )
     else:  # Price Category
         fig = px.bar(
-            df.groupby('Price_Category')['Price_Numeric'].mean().reset_index(),
+            average_by('category', 'Price_Category'),
             x='Price_Category',
             y='Price_Numeric',
             title="Average Price by Price Category",
             labels={'Price_Numeric': 'Average Price (A$)'}
         )
     
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,89 @@
+# In-memory cache of finished search results keyed by route and dates
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = float(os.environ.get("RESULT_CACHE_TTL", 600))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_SIZE", 100))
+
+
+# Function to normalise a search so equivalent requests share one key
+def search_key(search):
+    trip_type = search.get("trip_type") or "Round Trip"
+    arrival = search.get("arrival") if trip_type == "Round Trip" else None
+    return (
+        search["source"].strip().lower(),
+        search["destination"].strip().lower(),
+        str(search["departure"]),
+        str(arrival) if arrival else None,
+        trip_type,
+        str(search.get("departure_until") or "") or None,
+        str(search.get("return_until") or "") or None,
+    )
+
+
+class ResultCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    # Return the cached result for a search, or None if missing or older than the TTL
+    def get(self, search):
+        key = search_key(search)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry["stored_at"] >= self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    # Keep the url and the contents of every artifact, so the entry outlives the job folder it came from.
+    # The modification time is kept too, as the readers date relative labels from it
+    def put(self, search, url, artifacts):
+        files = {}
+        for name, path in artifacts.items():
+            with open(path, "rb") as f:
+                files[name] = (os.path.basename(path), f.read(), os.path.getmtime(path))
+        with self._lock:
+            self._entries[search_key(search)] = {"url": url, "files": files, "stored_at": time.monotonic()}
+            self._entries.move_to_end(search_key(search))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    # Drop one search, or everything when no search is given; returns how many entries were removed
+    def invalidate(self, search=None):
+        with self._lock:
+            if search is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                removed = 1 if self._entries.pop(search_key(search), None) is not None else 0
+            self._stats["invalidations"] += removed
+            return removed
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), ttl=self.ttl, max_entries=self.max_entries)
+
+
+# Function to write a cached entry's artifacts into a job folder and return their paths
+def materialize(entry, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    artifacts = {}
+    for name, (filename, content, mtime) in entry["files"].items():
+        path = os.path.join(output_dir, filename)
+        with open(path, "wb") as f:
+            f.write(content)
+        os.utime(path, (mtime, mtime))
+        artifacts[name] = path
+    return artifacts
@@ -1,13 +1,56 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from time import sleep
 import csv
+import os
 import pandas as pd
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.chrome.options import Options
-from datetime import datetime 
+from datetime import datetime, timedelta
+from driver_pool import get_pool
+from dom_extract import extract_price_history_labels, extract_grid_labels, extract_one_way_columns, extract_outer_html, split_grid_labels
+from fare_store import FareStore, route_key
+from one_way_grid import OneWayGridPager
+from snapshots import save_snapshot
+from date_grid_sweep import DateGridSweep, SWEEP_MAX_PAGES, EARLIER_DEPARTURES, LATER_DEPARTURES, EARLIER_RETURNS, LATER_RETURNS
+from waits import LatencyBudget, ScrapeCancelled, ScrapeTimeout, content_changed
+from metrics import metrics, enter_stage, span
+
+# One-way grid paging: stop once this many days past departure are visible, or after the page limit
+ONE_WAY_HORIZON_DAYS = 60
+ONE_WAY_MAX_PAGES = 20
+
+# Locators shared by the readiness conditions below
+FROM_INPUT = (By.XPATH, '//input[@aria-label="Where from? "]')
+TO_INPUT = (By.XPATH, '//input[@aria-label="Where to? "]')
+CITY_OPTION = (By.XPATH, '//li[@role="option" and @data-type="3"]')
+TRIP_TYPE_DROPDOWN = (By.XPATH, '//div[@role="combobox" and @aria-haspopup="listbox"]')
+TRIP_TYPE_LISTBOX = (By.XPATH, '//ul[@role="listbox" and @aria-label="Select your ticket type."]')
+PRICE_HISTORY_BUTTON = (By.XPATH, '//button[@aria-label="View price history"]')
+PRICE_HISTORY_CONTAINER = (By.XPATH, "//*[@id='yDmH0d']/c-wiz[2]/div/div[2]/c-wiz/div[1]/c-wiz/div[2]/div[2]/div[2]/div/div[2]/div[2]")
+PRICE_HISTORY_SERIES = (By.XPATH, '//*[@series-id="Price history"]')
+DATE_GRID_BUTTON = (By.XPATH, '//button[.//span[text()="Date grid"]]')
+ROUND_TRIP_PRICE_CELL = (By.XPATH, '//*[contains(@class, "OrLtze")]//div[@role="button" and contains(@aria-label, "A$")]')
+ONE_WAY_PRICE_CELL = (By.CSS_SELECTOR, 'div[data-row][data-col].QB2Jof')
+ONE_WAY_NEXT_BUTTON = (By.XPATH, '//*[@id="yDmH0d"]/div[8]/div[1]/div[3]/div[1]/div/div[2]/span/div/div[1]/div/div[2]/div[1]/div/div[1]/div[1]/button[2]')
+
+# Arrow buttons that page the round-trip date grid, used by sweep mode
+GRID_PAGE_BUTTONS = {
+    EARLIER_DEPARTURES: (By.XPATH, '//button[contains(@aria-label, "Earlier departure dates")]'),
+    LATER_DEPARTURES: (By.XPATH, '//button[contains(@aria-label, "Later departure dates")]'),
+    EARLIER_RETURNS: (By.XPATH, '//button[contains(@aria-label, "Earlier return dates")]'),
+    LATER_RETURNS: (By.XPATH, '//button[contains(@aria-label, "Later return dates")]'),
+}
+
+# Labels of the visible round-trip grid cells, used to detect that a grid page turn has rendered
+GRID_SIGNATURE_JS = """
+return Array.from(document.querySelectorAll('.OrLtze div[aria-label][role="button"]'))
+    .map(function (c) { return c.getAttribute('aria-label'); }).join('|');
+"""
+
+# Text of the visible one-way grid headers, used to detect that a page turn has rendered
+ONE_WAY_HEADER_SIGNATURE_JS = """
+return Array.from(document.querySelectorAll('div[jsname="vCVVjd"] > div.qh9ymb > div.pJYzRb'))
+    .map(function (h) { return h.textContent; }).join('|');
+"""
 
 def date_formatter(input_date):
     from datetime import datetime
@@ -21,19 +64,77 @@ def date_formatter(input_date):
     return formatted_date
 
 
-def data_scrapper(source, destination, departure, trip_type="Round Trip", arrival=None):
-    # Setup headless Chrome browser
-    chrome_option = Options()
-    chrome_option.add_argument('--headless=new')
-    chrome_option.add_argument('--disable-gpu')
-    chrome_option.add_argument("--start-maximized")
-    driver = webdriver.Chrome(options=chrome_option)
-    driver.get("https://www.google.com/travel/flights?gl=AU&hl=en")
-    wait = WebDriverWait(driver, 20)
-
-    print("Page loading")
-    sleep(1)
-
+def data_scrapper(source, destination, departure, trip_type="Round Trip", arrival=None, budget=None, output_dir=".", horizon_days=ONE_WAY_HORIZON_DAYS, fare_store=None, capture_dir=None, on_progress=None, departure_until=None, return_until=None):
+    # Borrow a warm headless Chrome browser from the pool
+    pool = get_pool()
+    with span("pool_checkout"):
+        driver = pool.checkout()
+    healthy = False
+    try:
+        # Each enter_stage() below closes the previous stage's timing span
+        with metrics.stage_sequence():
+            current_url = scrape_flights(driver, source, destination, departure, trip_type, arrival, budget, output_dir, horizon_days, fare_store, capture_dir, on_progress, departure_until, return_until)
+        healthy = True
+        return current_url
+    finally:
+        # Return the browser so the next search can reuse it
+        pool.release(driver, healthy=healthy)
+
+
+# Function to type a city and pick the first suggestion once the list has updated
+def enter_city(driver, budget, input_locator, city):
+    city_input = budget.until(driver, "city_entry", EC.element_to_be_clickable(input_locator))
+    city_input.clear()
+    city_input.send_keys(f"{city}")
+    budget.dom_settled(driver, "city_entry")
+    first_option = budget.until(driver, "city_entry", EC.element_to_be_clickable(CITY_OPTION))
+    first_option.click()
+    budget.until(driver, "city_entry", EC.invisibility_of_element_located(CITY_OPTION))
+
+
+# Function to page the round-trip grid until the sweep has covered its ranges; returns the merged matrix rows
+def sweep_date_grid(driver, budget, sweep, on_progress=None):
+    enter_stage("date_grid_sweep")
+    for i in range(SWEEP_MAX_PAGES):
+        move = sweep.next_move()
+        if move is None:
+            print(f"Date grid sweep finished after {i} page turns")
+            break
+        try:
+            previous_cells = driver.execute_script(GRID_SIGNATURE_JS)
+            budget.until(driver, "date_grid_sweep", EC.element_to_be_clickable(GRID_PAGE_BUTTONS[move])).click()
+            budget.until(driver, "date_grid_sweep", content_changed(GRID_SIGNATURE_JS, previous_cells))
+            budget.dom_settled(driver, "date_grid_sweep", quiet=0.2)
+
+            # The grid is re-rendered on each turn, so the container is looked up again
+            table_container = driver.find_element(By.CLASS_NAME, "OrLtze")
+            new_rows = sweep.ingest(split_grid_labels(extract_grid_labels(driver, table_container)))
+            if on_progress and new_rows:
+                on_progress("price_matrix", {"rows": new_rows, "partial": True})
+        except ScrapeCancelled:
+            raise
+        except ScrapeTimeout as e:
+            if e.budget_exhausted:
+                raise
+            # A missing or disabled arrow: try the next direction instead
+            print(f"Grid page turn '{move}' did not render: {e}")
+            sweep.mark_stalled()
+        except Exception as e:
+            print(f"Error on grid page turn {i+1}: {e}")
+            break
+    return sweep.matrix()
+
+
+def scrape_flights(driver, source, destination, departure, trip_type="Round Trip", arrival=None, budget=None, output_dir=".", horizon_days=ONE_WAY_HORIZON_DAYS, fare_store=None, capture_dir=None, on_progress=None, departure_until=None, return_until=None):
+    # Every step waits on a readiness condition; the budget caps each stage and the whole search
+    budget = budget or LatencyBudget()
+
+    # The pooled browser is already on the Google Flights home page
+    enter_stage("page_load")
+    budget.until(driver, "page_load", EC.element_to_be_clickable(FROM_INPUT))
+
+    departure_date = datetime.strptime(departure, "%Y-%m-%d").date()
+    arrival_raw = arrival
     departure = date_formatter(departure)
     print("Departure date formatted:", departure)
     departure_path = f'//div[@aria-label="{departure}"]'
@@ -44,281 +145,189 @@ def data_scrapper(source, destination, departure, trip_type="Round Trip", arriva
 
     # Select "One Way" option if needed
     if trip_type == "One Way":
-        dropdown = driver.find_element(By.XPATH, '//div[@role="combobox" and @aria-haspopup="listbox"]')
+        enter_stage("trip_type")
+        dropdown = budget.until(driver, "trip_type", EC.element_to_be_clickable(TRIP_TYPE_DROPDOWN))
         dropdown.click()
-        ul_list = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, '//ul[@role="listbox" and @aria-label="Select your ticket type."]'))
-        )
+        ul_list = budget.until(driver, "trip_type", EC.presence_of_element_located(TRIP_TYPE_LISTBOX))
         one_way_option = ul_list.find_element(By.XPATH, '//li[@data-value="2"]')
         one_way_option.click()
-        sleep(2)
-
-    # Enter source city
-    from_input = driver.find_element(By.XPATH, '//input[@aria-label="Where from? "]')
-    from_input.clear()
-    from_input.send_keys(f"{source}")
-    sleep(1)
-    first_option = driver.find_element(By.XPATH, '//li[@role="option" and @data-type="3"]')
-    first_option.click()
-    sleep(1)
-
-    # Enter destination city
-    from_input = driver.find_element(By.XPATH, '//input[@aria-label="Where to? "]')
-    from_input.clear()
-    from_input.send_keys(f"{destination}")
-    sleep(1)
-    first_option = driver.find_element(By.XPATH, '//li[@role="option" and @data-type="3"]')
-    first_option.click()
-    sleep(1)
+        budget.until(driver, "trip_type", EC.invisibility_of_element_located(TRIP_TYPE_LISTBOX))
+
+    # Enter source and destination cities
+    enter_stage("city_entry")
+    enter_city(driver, budget, FROM_INPUT, source)
+    enter_city(driver, budget, TO_INPUT, destination)
 
     # Select departure date
-    departure_input = wait.until(EC.element_to_be_clickable((By.XPATH, '//input[@aria-label="Departure"]')))
+    enter_stage("date_selection")
+    departure_input = budget.until(driver, "date_selection", EC.element_to_be_clickable((By.XPATH, '//input[@aria-label="Departure"]')))
     departure_input.click()
-    sleep(1)
-    departure_date_button = wait.until(EC.element_to_be_clickable((By.XPATH, departure_path)))
+    departure_date_button = budget.until(driver, "date_selection", EC.element_to_be_clickable((By.XPATH, departure_path)))
     departure_date_button.click()
-    sleep(1)
 
     # Select return date if round trip
     if trip_type == "Round Trip":
-        return_date_button = wait.until(EC.element_to_be_clickable((By.XPATH, arrival_path)))
+        return_date_button = budget.until(driver, "date_selection", EC.element_to_be_clickable((By.XPATH, arrival_path)))
         return_date_button.click()
-        sleep(1)
 
     # Click 'Done' after selecting dates
-    done_button = driver.find_element(By.XPATH, '//button[contains(@aria-label, "Done") and contains(., "Done")]')
+    done_button = budget.until(driver, "date_selection", EC.element_to_be_clickable((By.XPATH, '//button[contains(@aria-label, "Done") and contains(., "Done")]')))
     done_button.click()
 
-    # Click on 'Search' button
-    search_button = driver.find_element(By.XPATH, '//span[text()="Search"]/ancestor::button')
+    # Click on 'Search' button and wait for the results page
+    enter_stage("search")
+    search_button = budget.until(driver, "search", EC.element_to_be_clickable((By.XPATH, '//span[text()="Search"]/ancestor::button')))
     search_button.click()
-    sleep(1)
-
-    # driver.execute_script("window.scrollBy(0, 500);")
-    # sleep(3)
+    budget.until(driver, "search", lambda d: "/search" in d.current_url)
+    budget.until(driver, "search", EC.presence_of_element_located(DATE_GRID_BUTTON))
 
     # -------------------- PRICE HISTORY EXTRACTION --------------------
+    enter_stage("price_history")
     try:
-        if driver.find_element(By.XPATH, '//button[@aria-label="View price history"]'):
-            view_price_button = driver.find_element(By.XPATH, '//button[@aria-label="View price history"]')
-            driver.execute_script("window.scrollBy(0, 200);")
-            view_price_button.click()
-            sleep(3)
-        else:
-            driver.execute_script("window.scrollBy(0, 500);")
-            sleep(2)
-            view_price_button = driver.find_element(By.XPATH, '//button[@aria-label="View price history"]')
-            view_price_button.click()
-            sleep(3)
-
-        # Locate the price history graph container
-        container_div = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.XPATH, "//*[@id='yDmH0d']/c-wiz[2]/div/div[2]/c-wiz/div[1]/c-wiz/div[2]/div[2]/div[2]/div/div[2]/div[2]"))
-        )
-        print("0")
-
-        # Locate the SVG element that contains price data
-        price_graph_app = container_div.find_element(By.XPATH, './/*[@series-id="Price history"]')
-        print("1")
-
-        # Find the target group element that holds aria-labels
-        children = price_graph_app.find_elements(By.XPATH, './*[name()="g"]')
-        g4 = None
-        for g in children:
-            try:
-                if g.get_attribute("aria-hidden") == "true":
-                    continue
-                nested_g = g.find_element(By.XPATH, './/*[name()="g"][@aria-label]')
-                if nested_g:
-                    g4 = g
-                    break
-            except:
-                continue
-
-        # Extract aria-labels from nested <g> tags
-        aria_labels = []
-        if g4:
-            print("Found target <g> element.")
-            data_points = g4.find_elements(By.XPATH, './*[name()="g"]')
-            for point in data_points:
-                try:
-                    child_g = point.find_element(By.XPATH, './*[name()="g"]')
-                    aria_label = child_g.get_attribute("aria-label")
-                    if aria_label:
-                        aria_labels.append(aria_label)
-                except:
-                    continue
-            print("Extracted aria-labels:")
-        else:
+        view_price_button = budget.until(driver, "price_history", EC.presence_of_element_located(PRICE_HISTORY_BUTTON))
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", view_price_button)
+        budget.until(driver, "price_history", EC.element_to_be_clickable(PRICE_HISTORY_BUTTON)).click()
+
+        # Locate the price history graph container once its series has been drawn
+        container_div = budget.until(driver, "price_history", EC.presence_of_element_located(PRICE_HISTORY_CONTAINER))
+        budget.until(driver, "price_history", EC.presence_of_element_located(PRICE_HISTORY_SERIES))
+        budget.dom_settled(driver, "price_history")
+
+        # Pull every point's aria-label in a single scripted call
+        aria_labels = extract_price_history_labels(driver, container_div)
+        if capture_dir:
+            save_snapshot(capture_dir, "price_graph", extract_outer_html(driver, container_div), route_key(source, destination), driver.current_url)
+        if aria_labels is None:
             print("Target <g> element not found.")
+            aria_labels = []
+        else:
+            print("Extracted aria-labels:", len(aria_labels))
 
         # Save price history to CSV
-        with open("price_history_data.csv", "w", newline="") as f:
+        history_path = os.path.join(output_dir, "price_history_data.csv")
+        with open(history_path, "w", newline="") as f:
             writer = csv.writer(f)
             writer.writerow(["aria-label"])
             for label in aria_labels:
                 writer.writerow([label])
 
         print("Saved", len(aria_labels), "points to price_history_data.csv")
-
-        view_price_button = driver.find_element(By.XPATH, '//button[@aria-label="View price history"]')
-        view_price_button.click()
-        sleep(1)
+        # Publish the points now; the date grid and listings are still to come
+        if on_progress:
+            on_progress("price_history", {"path": history_path, "labels": aria_labels, "reference_date": datetime.now().date().isoformat()})
+
+        budget.until(driver, "price_history", EC.element_to_be_clickable(PRICE_HISTORY_BUTTON)).click()
+        budget.until(driver, "price_history", EC.invisibility_of_element_located(PRICE_HISTORY_SERIES))
+    except ScrapeCancelled:
+        raise
+    except ScrapeTimeout as e:
+        # The price history panel is optional, but a spent budget ends the search
+        if e.budget_exhausted:
+            raise
+        print("Error extracting price history:", e)
     except Exception as e:
         print("Error extracting price history:", e)
         pass
 
 
     # -------------------- DATE GRID EXTRACTION --------------------
-    
-    if driver.find_element(By.XPATH, '//button[.//span[text()="Date grid"]]'):
-        date_grid_button = driver.find_element(By.XPATH, '//button[.//span[text()="Date grid"]]')
-        date_grid_button.click()
-        sleep(3)
-    else:
-        driver.execute_script("window.scrollBy(0, 200);")
-        sleep(2)
-        date_grid_button = driver.find_element(By.XPATH, '//button[.//span[text()="Date grid"]]')
-        date_grid_button.click()
-        sleep(3)
+    enter_stage("date_grid")
+    date_grid_button = budget.until(driver, "date_grid", EC.presence_of_element_located(DATE_GRID_BUTTON))
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", date_grid_button)
+    budget.until(driver, "date_grid", EC.element_to_be_clickable(DATE_GRID_BUTTON)).click()
 
     if trip_type == "Round Trip":
         # Extract round trip price matrix
-        table_container = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "OrLtze"))
-        )
-        price_cells = table_container.find_elements(By.XPATH, './/div[@aria-label and @role="button"]')
-
-        data = []
-        for cell in price_cells:
-            aria = cell.get_attribute("aria-label")
-            if aria and "A$" in aria:
-                price_part, date_range = aria.split(",", 1)
-                data.append({
-                    "Price": price_part.strip(),
-                    "Dates": date_range.strip()
-                })
+        table_container = budget.until(driver, "date_grid", EC.presence_of_element_located((By.CLASS_NAME, "OrLtze")))
+        budget.until(driver, "date_grid", EC.presence_of_element_located(ROUND_TRIP_PRICE_CELL))
+        budget.dom_settled(driver, "date_grid")
+        data = split_grid_labels(extract_grid_labels(driver, table_container))
+        if capture_dir:
+            save_snapshot(capture_dir, "date_grid", extract_outer_html(driver, table_container), route_key(source, destination), driver.current_url)
+
+        # Sweep mode: page the grid across the requested ranges in this same session and merge every window
+        if departure_until or return_until:
+            arrival_date = datetime.strptime(arrival_raw, "%Y-%m-%d").date()
+            sweep = DateGridSweep(
+                (departure_date, datetime.strptime(departure_until, "%Y-%m-%d").date() if departure_until else departure_date),
+                (arrival_date, datetime.strptime(return_until, "%Y-%m-%d").date() if return_until else arrival_date),
+            )
+            first_rows = sweep.ingest(data)
+            if on_progress and first_rows:
+                on_progress("price_matrix", {"rows": first_rows, "partial": True})
+            data = sweep_date_grid(driver, budget, sweep, on_progress)
+            print(f"Swept the date grid: {len(data)} fares, {sweep.coverage():.0%} of the requested range")
 
         # Save to CSV
-        with open("flight_price_matrix.csv", "w", newline="", encoding="utf-8") as f:
+        matrix_path = os.path.join(output_dir, "flight_price_matrix.csv")
+        with open(matrix_path, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=["Price", "Dates"])
             writer.writeheader()
             writer.writerows(data)
+        if on_progress:
+            on_progress("price_matrix", {"path": matrix_path, "rows": data})
 
         print(f"✅ Extracted {len(data)} entries and saved to 'flight_price_matrix.csv'")
 
     elif trip_type == "One Way":
-        import re
-        header_elements = driver.find_elements(By.XPATH, '//div[@jsname="vCVVjd"]/div[contains(@class, "qh9ymb")]/div[contains(@class, "pJYzRb")]')
-        column_map = []
+        budget.until(driver, "date_grid", EC.presence_of_element_located(ONE_WAY_PRICE_CELL))
+        budget.dom_settled(driver, "date_grid")
 
-        # Extract header positions to align prices
-        for header in header_elements:
-            try:
-                transform_style = header.find_element(By.XPATH, '..').get_attribute('style')
-                match = re.search(r'translate3d\(([-\d.]+)px', transform_style)
-                x_offset = float(match.group(1)) if match else 0.0
-                spans = header.find_elements(By.TAG_NAME, "span")
-                day = spans[0].text.strip()
-                date = spans[1].text.strip()
-                column_map.append({"x_offset": x_offset, "day": day, "date": date})
-            except:
-                pass
-
-        # Extract prices and match to headers
-        price_elements = driver.find_elements(By.CSS_SELECTOR, 'div[data-row][data-col].QB2Jof')
-        data = []
-        for price_el in price_elements:
-            try:
-                price_text = price_el.text.strip()
-                col_style = price_el.find_element(By.XPATH, '..').get_attribute('style')
-                match = re.search(r'translate3d\(([-\d.]+)px', col_style)
-                x_offset_price = float(match.group(1)) if match else None
-                matched_header = min(column_map, key=lambda x: abs(x['x_offset'] - x_offset_price)) if x_offset_price is not None else None
-                data.append({
-                    "Day": matched_header['day'] if matched_header else '',
-                    "Date": matched_header['date'] if matched_header else '',
-                    "Price": price_text
-                })
-            except Exception as e:
-                print(f"Error extracting price: {e}")
+        # Extract headers and prices in one call; the pager remembers which columns it has already seen
+        pager = OneWayGridPager(departure_date, horizon_date=departure_date + timedelta(days=horizon_days))
+        data = pager.ingest(extract_one_way_columns(driver))
 
         # Save to CSV
         df = pd.DataFrame(data)
-        df.to_csv("accurate_flight_prices.csv", index=False)
-
-        # Avoid duplicate entries using a set
-        csv_file = 'flight_prices.csv'
-        import os
-        existing_data = set()
-        if os.path.exists(csv_file):
-            with open(csv_file, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    key = (row['Day'], row['Date'], row['Price'])
-                    existing_data.add(key)
-
-        fieldnames = ['Day', 'Date', 'Price']
-        with open(csv_file, mode='a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            if os.stat(csv_file).st_size == 0:
-                writer.writeheader()
-
-            # Scroll through chart and capture new data
-            for i in range(20):
-                try:
-                    button = driver.find_element(By.XPATH, '//*[@id="yDmH0d"]/div[8]/div[1]/div[3]/div[1]/div/div[2]/span/div/div[1]/div/div[2]/div[1]/div/div[1]/div[1]/button[2]')
-                    button.click()
-                    print(f"Clicked {i+1} times")
-                    sleep(0.5)
-
-                    # Re-extract headers
-                    header_elements = driver.find_elements(By.XPATH, '//div[@jsname="vCVVjd"]/div[contains(@class, "qh9ymb")]/div[contains(@class, "pJYzRb")]')
-                    column_map = []
-                    for header in header_elements:
-                        try:
-                            transform_style = header.find_element(By.XPATH, '..').get_attribute('style')
-                            match = re.search(r'translate3d\(([-\d.]+)px', transform_style)
-                            x_offset = float(match.group(1)) if match else 0.0
-                            spans = header.find_elements(By.TAG_NAME, "span")
-                            day = spans[0].text.strip()
-                            date = spans[1].text.strip()
-                            column_map.append({"x_offset": x_offset, "day": day, "date": date})
-                        except:
-                            pass
-
-                    # Re-extract prices
-                    price_elements = driver.find_elements(By.CSS_SELECTOR, 'div[data-row][data-col].QB2Jof')
-                    for price_el in price_elements:
-                        try:
-                            price_text = price_el.text.strip()
-                            col_style = price_el.find_element(By.XPATH, '..').get_attribute('style')
-                            match = re.search(r'translate3d\(([-\d.]+)px', col_style)
-                            x_offset_price = float(match.group(1)) if match else None
-                            matched_header = min(column_map, key=lambda x: abs(x['x_offset'] - x_offset_price)) if x_offset_price else None
-                            new_row = {
-                                "Day": matched_header['day'] if matched_header else '',
-                                "Date": matched_header['date'] if matched_header else '',
-                                "Price": price_text
-                            }
-                            key = (new_row["Day"], new_row["Date"], new_row["Price"])
-                            if key not in existing_data:
-                                writer.writerow(new_row)
-                                existing_data.add(key)
-                        except Exception as e:
-                            print(f"Error extracting price: {e}")
-
-                except Exception as e:
-                    print(f"Error on click {i+1}: {e}")
-                    break
+        df.to_csv(os.path.join(output_dir, "accurate_flight_prices.csv"), index=False)
+
+        # Record fares in the indexed store; its unique key drops rows already seen today
+        fare_store = fare_store or FareStore()
+        route = route_key(source, destination)
+        scraped_at = datetime.now()
+        inserted = fare_store.add_fares(route, data, scraped_at=scraped_at)
+        if on_progress:
+            on_progress("one_way_prices", {"rows": data})
+
+        # Page the chart forward until the requested horizon is covered
+        enter_stage("one_way_paging")
+        for i in range(ONE_WAY_MAX_PAGES):
+            if pager.covered():
+                print(f"Horizon {pager.horizon_date} covered after {i} clicks")
+                break
+            try:
+                button = budget.until(driver, "one_way_paging", EC.element_to_be_clickable(ONE_WAY_NEXT_BUTTON))
+                previous_headers = driver.execute_script(ONE_WAY_HEADER_SIGNATURE_JS)
+                button.click()
+                print(f"Clicked {i+1} times")
+                budget.until(driver, "one_way_paging", content_changed(ONE_WAY_HEADER_SIGNATURE_JS, previous_headers))
+                budget.dom_settled(driver, "one_way_paging", quiet=0.2)
+
+                # Extract the page and keep only rows from newly revealed columns
+                page_rows = pager.ingest(extract_one_way_columns(driver))
+                inserted += fare_store.add_fares(route, page_rows, scraped_at=scraped_at)
+                if on_progress and page_rows:
+                    on_progress("one_way_prices", {"rows": page_rows})
+
+            except ScrapeCancelled:
+                raise
+            except ScrapeTimeout as e:
+                if e.budget_exhausted:
+                    raise
+                print(f"Error on click {i+1}: {e}")
+                break
+            except Exception as e:
+                print(f"Error on click {i+1}: {e}")
+                break
 
+        print(f"Stored {inserted} new fares for {route} in {fare_store.path}")
         print("✅ accurate_flight_prices.csv saved.")
 
     # Final cleanup
-    ok_button = driver.find_element(By.XPATH, '//button[.//span[text()="OK"]]')
+    enter_stage("cleanup")
+    ok_button = budget.until(driver, "cleanup", EC.element_to_be_clickable((By.XPATH, '//button[.//span[text()="OK"]]')))
     ok_button.click()
-    sleep(1)
+    budget.dom_settled(driver, "cleanup")
     current_url = driver.current_url
-    driver.quit()
-    
+
     return current_url
@@ -1,7 +1,22 @@
 # Import necessary libraries
-from bs4 import BeautifulSoup
-import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from collections import OrderedDict
+import hashlib
 import json
+import os
+import threading
+from http_fetch import fetch_page
+from snapshots import save_snapshot
+from metrics import span
+
+# Only the flight listing subtrees are built when a page is parsed. The class is matched as a token,
+# like the li.pIav2d selector, so listings carrying extra classes are kept
+LISTING_STRAINER = SoupStrainer('li', class_=lambda classes: classes is not None and 'pIav2d' in classes.split())
+
+# Parsed listings of recently seen pages, keyed by a digest of the HTML rather than the page itself
+PARSE_CACHE_SIZE = 32
+_parsed_pages = OrderedDict()
+_parsed_pages_lock = threading.Lock()
 
 # Function to scrape listing elements from Google Flights
 def scrape_listings(soup):
@@ -38,11 +53,24 @@ def scrape_flight_stops(listing):
     stops_element = listing.select_one('div.EfT7Ae span.ogfYpf')
     return stops_element.text.strip()
 
-# Main function
-def airline_data(url):
-    # Make a request to Google Flights URL and parse HTML
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+# Function to parse every listing on a page; memoised so a cached page is only parsed once.
+# Every caller gets its own copies of the listing dictionaries
+def parse_flight_data(html):
+    digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    with _parsed_pages_lock:
+        flight_data = _parsed_pages.get(digest)
+        if flight_data is not None:
+            _parsed_pages.move_to_end(digest)
+    if flight_data is None:
+        flight_data = _parse_listings(html)
+        with _parsed_pages_lock:
+            _parsed_pages[digest] = flight_data
+            while len(_parsed_pages) > PARSE_CACHE_SIZE:
+                _parsed_pages.popitem(last=False)
+    return [dict(flight_info) for flight_info in flight_data]
+
+def _parse_listings(html):
+    soup = BeautifulSoup(html, 'lxml', parse_only=LISTING_STRAINER)
 
     # Scrape flight listings
     listings = scrape_listings(soup)
@@ -70,6 +98,21 @@ def airline_data(url):
 
         flight_data.append(flight_info)
 
+    return tuple(flight_data)
+
+# Main function
+def airline_data(url, output_dir=".", capture_dir=None, route=None, on_progress=None):
+    # Fetch the Google Flights page through the pooled, cached session and parse the listings
+    with span("listings_fetch"):
+        html = fetch_page(url)
+    if capture_dir:
+        save_snapshot(capture_dir, "listings", html, route, url)
+    with span("listings_parse"):
+        flight_data = list(parse_flight_data(html))
+
     # Save results to a JSON file
-    with open('google_flights_data.json', 'w') as json_file:
+    listings_path = os.path.join(output_dir, 'google_flights_data.json')
+    with open(listings_path, 'w') as json_file:
         json.dump(flight_data, json_file, indent=4)
+    if on_progress:
+        on_progress("listings", {"path": listings_path, "flights": flight_data})
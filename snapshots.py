@@ -0,0 +1,143 @@
+# Capture raw page sections during a scrape and parse them later, offline, across a process pool
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import quote
+
+from bs4 import BeautifulSoup
+
+from dom_extract import split_grid_labels
+
+# Capture is off unless a directory is given here or passed to the scrapers
+DEFAULT_CAPTURE_DIR = os.environ.get("SNAPSHOT_DIR")
+SECTIONS = ("price_graph", "date_grid", "listings")
+
+
+# Function to store one section's HTML with a metadata sidecar; returns the HTML path
+def save_snapshot(capture_dir, section, html, route=None, url=None, captured_at=None):
+    captured_at = captured_at or datetime.now()
+    directory = os.path.join(capture_dir, section)
+    os.makedirs(directory, exist_ok=True)
+
+    name = f"{captured_at:%Y%m%d-%H%M%S}-{quote(route or 'unknown', safe='')}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(directory, f"{name}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump({"section": section, "route": route, "url": url, "captured_at": captured_at.isoformat()}, f)
+    return path
+
+
+# Function to read price history aria-labels from a stored graph container, mirroring dom_extract.PRICE_HISTORY_JS
+def parse_price_graph(html):
+    soup = BeautifulSoup(html, "lxml")
+    graph = soup.select_one('[series-id="Price history"]')
+    if graph is None:
+        return []
+    target = next(
+        (g for g in graph.find_all("g", recursive=False)
+         if g.get("aria-hidden") != "true" and g.select_one("g[aria-label]") is not None),
+        None,
+    )
+    if target is None:
+        return None
+    labels = []
+    for point in target.find_all("g", recursive=False):
+        child = point.find("g", recursive=False)
+        label = child.get("aria-label") if child is not None else None
+        if label:
+            labels.append(label)
+    return labels
+
+
+# Function to read Price/Dates rows from a stored round-trip date grid, mirroring dom_extract.GRID_LABELS_JS
+def parse_date_grid(html):
+    soup = BeautifulSoup(html, "lxml")
+    labels = [cell.get("aria-label") for cell in soup.select('div[aria-label][role="button"]')]
+    return split_grid_labels([label for label in labels if label])
+
+
+# Function to read flight listings from a stored results page
+def parse_listings(html):
+    # Imported here because scrapper2 itself writes snapshots through this module
+    from scrapper2 import parse_flight_data
+    return list(parse_flight_data(html))
+
+
+PARSERS = {
+    "price_graph": parse_price_graph,
+    "date_grid": parse_date_grid,
+    "listings": parse_listings,
+}
+
+
+# Function to list stored snapshot files, optionally for one section only
+def list_snapshots(capture_dir, section=None):
+    sections = [section] if section else SECTIONS
+    paths = []
+    for name in sections:
+        directory = os.path.join(capture_dir, name)
+        if os.path.isdir(directory):
+            paths.extend(os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(".html"))
+    return paths
+
+
+# Function executed inside a worker process for a single snapshot; a parse error is reported, not raised
+def parse_snapshot(path):
+    meta_path = path[:-len(".html")] + ".json"
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    section = meta.get("section") or os.path.basename(os.path.dirname(path))
+    result = {"path": path, "section": section, "route": meta.get("route"), "captured_at": meta.get("captured_at")}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result.update(rows=PARSERS[section](f.read()), error=None)
+    except Exception as e:
+        result.update(rows=None, error=f"{type(e).__name__}: {e}")
+    return result
+
+
+# Main function: parse every stored snapshot across `workers` processes, yielding results in file order
+def parse_snapshots(capture_dir, section=None, workers=None, chunksize=8):
+    paths = list_snapshots(capture_dir, section)
+    if not paths:
+        return
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        yield from executor.map(parse_snapshot, paths, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-parse stored page snapshots without scraping again.")
+    parser.add_argument("capture_dir", nargs="?", default=DEFAULT_CAPTURE_DIR, help="snapshot directory (default: SNAPSHOT_DIR)")
+    parser.add_argument("--section", choices=SECTIONS, help="only parse this section")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--output", help="write one JSON result per line to this file instead of stdout")
+    args = parser.parse_args(argv)
+    if not args.capture_dir:
+        parser.error("no snapshot directory given and SNAPSHOT_DIR is not set")
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    parsed = failed = 0
+    try:
+        for result in parse_snapshots(args.capture_dir, args.section, args.workers):
+            out.write(json.dumps(result) + "\n")
+            parsed += 1
+            failed += result["error"] is not None
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Parsed {parsed} snapshots, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
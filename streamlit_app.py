@@ -3,10 +3,20 @@ import pandas as pd
 import requests
 import os
 import json
-from process1 import process_price_history, load_and_clean_data, display_price_matrix, analyze_flight_statistics, create_price_comparison_chart
+from process1 import parse_price_history_labels, process_price_history, load_and_clean_data, display_price_matrix, analyze_flight_statistics, create_price_comparison_chart, load_price_matrix_history
+from fare_store import route_key
 from api_integration import generate_gemini_insights, prepare_data_summary
-import plotly.express as px
+from insights_cache import InsightsCache
+from flight_stats import compute_flight_aggregates
+from price_series import PriceSeriesStore
+from chart_render import line_chart, downsample_lines
 import atexit 
+import time
+import threading
+from datetime import date
+from warmup import DASHBOARD_MODULES, prewarm
+
+API_URL = "http://localhost:5000"
 # register your cleanup function
 def cleanup_files():
     files_to_delete = [
@@ -20,6 +30,71 @@ def cleanup_files():
 
 atexit.register(cleanup_files)
 
+# Bound on how many artifact versions each cached stage keeps before evicting the oldest
+CACHE_MAX_ENTRIES = 16
+
+
+# Function to fingerprint an artifact file; rewriting the file changes the fingerprint and so the cache key
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+# Cached load/clean/aggregate stages keyed on the fingerprint, so widget reruns skip them.
+# The matrix and its aggregates are shared objects and must not be modified by the views.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_price_history(fingerprint):
+    return process_price_history(fingerprint[0])
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_price_matrix(fingerprint):
+    return load_and_clean_data(fingerprint[0])
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_aggregates(fingerprint):
+    return compute_flight_aggregates(cached_price_matrix(fingerprint))
+
+
+# Cheapest and average price of each saved scrape of a route, read from the history store
+@st.cache_data(ttl=60, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_route_history(route):
+    history = load_price_matrix_history(routes=[route], columns=['scrape_date', 'Price_Numeric'])
+    if history.empty:
+        return history
+    return history.groupby('scrape_date')['Price_Numeric'].agg(['min', 'mean']).reset_index()
+
+
+# Daily or weekly long-term series of a route, read from the precomputed rolling statistics
+@st.cache_data(ttl=60, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_route_series(route, resolution):
+    return PriceSeriesStore().trend(route, resolution=resolution)
+
+
+# One disk-backed insights cache shared by every session
+@st.cache_resource
+def insights_cache():
+    return InsightsCache()
+
+
+# Changing the comparison selectbox reruns only this fragment, not the whole page
+@st.fragment
+def comparison_fragment(df, aggregates):
+    create_price_comparison_chart(df, aggregates)
+
+
+# Plotly and the Gemini SDK are loaded on first use; start loading them in the background once per server
+# process while the user fills in the search form
+@st.cache_resource(show_spinner=False)
+def warm_dashboard_imports():
+    thread = threading.Thread(target=prewarm, args=(DASHBOARD_MODULES,), daemon=True)
+    thread.start()
+    return thread
+
+
+warm_dashboard_imports()
+
 # Set the title of the app
 st.title("Airlines Data")
 
@@ -27,31 +102,35 @@ st.title("Airlines Data")
 # trip_type = st.selectbox("Select Trip Type", ["Round Trip", "One Way"])
 trip_type = "Round Trip"
 
-def data_trends():
+def data_trends(artifacts):
     st.header("Data Trends")
     try:
-        if os.path.exists("price_history_data.csv"):
-            PRICE_HISTORY_PATH = "price_history_data.csv"
+        PRICE_HISTORY_PATH = artifacts.get("price_history", "price_history_data.csv")
+        if os.path.exists(PRICE_HISTORY_PATH):
             st.subheader(":chart_with_upwards_trend: Price History (Past 60 Days)")
             
             if not os.path.exists(PRICE_HISTORY_PATH):
                 st.error("CSV file not found!")
                 return
 
-            df = pd.read_csv(PRICE_HISTORY_PATH)
-
-            # If not already cleaned, clean it
-            if 'aria-label' in df.columns:
-                df = process_price_history(PRICE_HISTORY_PATH)
+            # Raw scrapes hold aria-labels; older cleaned files already hold Date/Price
+            columns = pd.read_csv(PRICE_HISTORY_PATH, nrows=0).columns
+            if 'aria-label' in columns:
+                df = cached_price_history(file_fingerprint(PRICE_HISTORY_PATH))
+                malformed = df.attrs.get("malformed_rows")
+                if malformed is not None and len(malformed):
+                    st.warning(f"{len(malformed)} price history rows could not be parsed and were skipped.")
             else:
-                df['Date'] = pd.to_datetime(df['Date'])
+                df = pd.read_csv(PRICE_HISTORY_PATH)
 
             df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
             df = df.dropna(subset=['Date'])
+            # Long merged histories are thinned to their shape-defining points before labelling
+            df = downsample_lines(df.sort_values('Date'), 'Date', 'Price')
             df["Date"] = df["Date"].dt.strftime("%b %d")
             tick_labels = df["Date"].tolist()
             tickvals = [tick_labels[i] for i in range(0, len(tick_labels), 7)]
-            fig = px.line(df, x="Date", y="Price", markers=True)
+            fig = line_chart(df, x="Date", y="Price", markers=True)
             fig.update_layout(
                 xaxis_title="Date",
                 yaxis_title="Price (A$)",
@@ -69,9 +148,13 @@ def data_trends():
         st.error(f"An error occurred while processing the price history data: {e}")
         pass
 
-    if os.path.exists("flight_price_matrix.csv"):
-        PRICE_MATRIX_PATH = "flight_price_matrix.csv"
-        df = load_and_clean_data(PRICE_MATRIX_PATH)
+    PRICE_MATRIX_PATH = artifacts.get("price_matrix", "flight_price_matrix.csv")
+    if os.path.exists(PRICE_MATRIX_PATH):
+        fingerprint = file_fingerprint(PRICE_MATRIX_PATH)
+        df = cached_price_matrix(fingerprint)
+
+        # Compute every rollup once and share it with the statistics, comparison chart and AI summary
+        aggregates = cached_aggregates(fingerprint)
         st.markdown("---")
         
         # Display the data
@@ -80,12 +163,12 @@ def data_trends():
         st.markdown("---")
             
         # Analyze statistics
-        stats = analyze_flight_statistics(df)
+        stats = analyze_flight_statistics(df, aggregates)
             
         st.markdown("---")
             
         # Create comparison chart
-        create_price_comparison_chart(df)
+        comparison_fragment(df, aggregates)
         
         st.markdown("---")
             
@@ -94,18 +177,49 @@ def data_trends():
         st.header("🤖 AI-Powered Flight Insights")
                 
         with st.spinner("Analyzing data with Gemini AI..."):
-            data_summary = prepare_data_summary(df)
-            ai_insights = generate_gemini_insights(data_summary, api_key)
+            data_summary = prepare_data_summary(df, aggregates)
+            ai_insights = generate_gemini_insights(data_summary, api_key, cache=insights_cache())
                     
             st.subheader("Key Trends and Recommendations")
             st.write(ai_insights)
     else:
         st.error("Flight price matrix data not found.")
+
+    # Price of this route across every saved scrape
+    search = st.session_state.get("search")
+    if search:
+        trend = cached_route_history(route_key(search["source"], search["destination"]))
+        if len(trend) > 1:
+            st.markdown("---")
+            st.subheader("Route Price Across Saved Scrapes")
+            fig = line_chart(
+                trend,
+                x='scrape_date',
+                y=['min', 'mean'],
+                markers=True,
+                labels={'scrape_date': 'Scrape Date', 'value': 'Price (A$)', 'variable': 'Statistic'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Every price history scrape of this route merged into one series
+        resolution = st.radio("Long-term resolution", ["daily", "weekly"], horizontal=True, key="series_resolution")
+        series = cached_route_series(route_key(search["source"], search["destination"]), resolution)
+        if len(series) > 1:
+            st.subheader("Long-Term Price Trend")
+            fig = line_chart(
+                series,
+                x='Date',
+                y=['Price', 'mean', 'min', 'max'] if resolution == "daily" else ['mean', 'min', 'max'],
+                labels={'value': 'Price (A$)', 'variable': 'Series'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            if resolution == "daily":
+                st.caption(f"Latest 7-day volatility: A$ {series['volatility'].iloc[-1]:.2f}")
     
 
-def airline_data():
+def airline_data(artifacts):
     st.header("Airline Data")
-    JSON_PATH = "google_flights_data.json"
+    JSON_PATH = artifacts.get("listings", "google_flights_data.json")
 
         # Check if file exists
     if not os.path.exists(JSON_PATH):
@@ -159,6 +273,16 @@ if trip_type == "Round Trip":
         departure = st.date_input("Departure")
     with col4:
         arrival = st.date_input("Arrival")
+
+    # Optional sweep: one browser session pages the date grid out to these dates
+    if st.checkbox("Sweep a range of dates"):
+        col5, col6 = st.columns(2)
+        with col5:
+            departure_until = st.date_input("Latest departure", value=departure, min_value=departure)
+        with col6:
+            return_until = st.date_input("Latest return", value=arrival, min_value=arrival)
+    else:
+        departure_until = return_until = None
 else:
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -168,6 +292,72 @@ else:
     with col3:
         departure = st.date_input("Departure")
 
+# Function to yield (event, data) pairs from a server-sent event stream
+def read_events(response):
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+# Function to draw one partial result (price history, grid cells, one-way fares or listings) into the preview area
+def render_partial(kind, data, preview, state):
+    if kind == "price_history" and data["labels"]:
+        df, _ = parse_price_history_labels(data["labels"], date.fromisoformat(data["reference_date"]))
+        preview.subheader(":chart_with_upwards_trend: Price History")
+        preview.plotly_chart(line_chart(df, x="Date", y="Price", markers=True), use_container_width=True)
+    elif kind == "price_matrix" and data["rows"]:
+        # A sweep sends each new grid window as a partial event, then the merged matrix
+        if data.get("partial"):
+            state.setdefault("grid_rows", []).extend(data["rows"])
+        else:
+            state["grid_rows"] = list(data["rows"])
+        if "grid_table" not in state:
+            state["grid_table"] = preview.empty()
+        df = pd.DataFrame(state["grid_rows"])
+        df["Price_Numeric"] = pd.to_numeric(df["Price"].str.replace("A$", "", regex=False).str.replace(",", "", regex=False), errors="coerce")
+        with state["grid_table"].container():
+            st.subheader(f"Date Grid: {len(df)} fares")
+            st.dataframe(df.nsmallest(10, "Price_Numeric")[["Price", "Dates"]], use_container_width=True, hide_index=True)
+    elif kind == "one_way_prices":
+        # Fares from every one-way page are redrawn in one table as pages arrive
+        state.setdefault("one_way_rows", []).extend(data["rows"])
+        if "one_way_table" not in state:
+            state["one_way_table"] = preview.empty()
+        state["one_way_table"].dataframe(pd.DataFrame(state["one_way_rows"]), use_container_width=True, hide_index=True)
+    elif kind == "listings":
+        preview.subheader(f"Airline Listings: {len(data['flights'])} flights")
+        preview.dataframe(pd.DataFrame(data["flights"]), use_container_width=True, hide_index=True)
+
+
+# Function to follow a job's events until it finishes; returns the final job, or None if the stream dropped
+def follow_job(job_id, status_box, preview):
+    job = None
+    state = {}
+    try:
+        with requests.get(f"{API_URL}/jobs/{job_id}/events", stream=True, timeout=(10, 60)) as response:
+            for kind, data in read_events(response):
+                if kind == "status":
+                    job = data
+                    status_box.info(f"⏳ Please wait while we scrape the data... (job {job_id} is {job['status']})")
+                    if job["status"] not in ("queued", "running"):
+                        break
+                else:
+                    render_partial(kind, data, preview, state)
+    except requests.RequestException as e:
+        print("Event stream interrupted:", e)
+        return None
+    return job
+
+
 # State to track if submission was successful
 if "show_segmented" not in st.session_state:
     st.session_state.show_segmented = False
@@ -180,17 +370,51 @@ if st.button("Submit"):
         "departure": str(departure),
         "arrival": str(arrival) if trip_type == "Round Trip" else None
     }
-    with st.spinner("⏳ Please wait while we scrape the data..."):
-        response = requests.post("http://localhost:5000/submit", json=data, timeout=120)
+    if trip_type == "Round Trip" and departure_until:
+        data.update(departure_until=str(departure_until), return_until=str(return_until))
+    # Queue the search; the backend answers straight away with a job id
+    response = requests.post(f"{API_URL}/submit", json=data, timeout=10)
 
-    if response.status_code == 200:
-        st.success("✅ Data received successfully!")
-        st.session_state.show_segmented = True
+    if response.status_code == 202:
+        st.session_state.job_id = response.json()["job_id"]
+        st.session_state.waiter = response.json()["waiter"]
+        st.session_state.show_segmented = False
     else:
         st.error("❌ Error occurred")
         st.text(response.text)
         st.session_state.show_segmented = False
 
+# Follow the queued job's event stream; each partial result is drawn as soon as its stage finishes
+if st.session_state.get("job_id"):
+    job_id = st.session_state.job_id
+    if st.button("Cancel"):
+        requests.delete(f"{API_URL}/jobs/{job_id}", params={"waiter": st.session_state.waiter}, timeout=10)
+    status_box = st.empty()
+    status_box.info(f"⏳ Please wait while we scrape the data... (job {job_id})")
+    preview = st.empty()
+
+    job = follow_job(job_id, status_box, preview.container())
+    if job is None:
+        # The stream dropped; fall back to the job's current status
+        job = requests.get(f"{API_URL}/jobs/{job_id}", timeout=10).json()
+
+    if job.get("status") in ("queued", "running"):
+        time.sleep(1)
+        st.rerun()
+    elif job.get("status") == "done":
+        # The full views below replace the previews
+        preview.empty()
+        status_box.success("✅ Data received successfully!" + (" (served from cache)" if job.get("from_cache") else ""))
+        st.session_state.artifacts = job["artifacts"]
+        st.session_state.search = job["search"]
+        st.session_state.show_segmented = True
+        st.session_state.job_id = None
+    else:
+        st.error(f"❌ Job {job.get('status', 'failed')}")
+        st.text(job.get("error") or json.dumps(job))
+        st.session_state.show_segmented = False
+        st.session_state.job_id = None
+
 # Show segmented control if submission was successful
 if st.session_state.get("show_segmented", False):
     selected = st.segmented_control(
@@ -200,7 +424,8 @@ if st.session_state.get("show_segmented", False):
         selection_mode="single",
         key="data_view"
     )
+    artifacts = st.session_state.get("artifacts", {})
     if selected == "Data Trends":
-        data_trends()
+        data_trends(artifacts)
     elif selected == "Airline Data":
-        airline_data()
\ No newline at end of file
+        airline_data(artifacts)
\ No newline at end of file
@@ -0,0 +1,15 @@
+import json
+
+from api_integration import build_insights_prompt, prepare_data_summary
+from benchmarks.generators import REFERENCE_DATE, price_matrix_rows, write_csv
+from process1 import load_and_clean_data
+
+
+def test_data_summary_is_json_serialisable(tmp_path):
+    # Compact dtypes (Int16 durations, categoricals) must not leak numpy keys into the summary
+    path = write_csv(price_matrix_rows(500), str(tmp_path / "flight_price_matrix.csv"))
+    summary = prepare_data_summary(load_and_clean_data(path, reference_date=REFERENCE_DATE))
+
+    json.dumps(summary, default=str)
+    assert all(type(key) is int for key in summary["duration_analysis"]["mean"])
+    assert build_insights_prompt(summary)
@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+
+from date_grid_sweep import DateGridSweep
+
+
+def grid_window(first_departure, first_return, size=7):
+    # One grid window in the Price/Dates layout of flight_price_matrix.csv
+    rows = []
+    for d in range(size):
+        for r in range(size):
+            departure = first_departure + timedelta(days=d)
+            returning = first_return + timedelta(days=r)
+            rows.append({"Price": "A$100", "Dates": f"{departure:%b} {departure.day} to {returning:%b} {returning.day}"})
+    return rows
+
+
+def test_far_future_range_is_ingested():
+    # More than six months ahead of today: headers must resolve against the range, not the scrape date
+    departure_start, return_start = date(2027, 6, 4), date(2027, 6, 11)
+    sweep = DateGridSweep((departure_start, departure_start + timedelta(days=6)), (return_start, return_start + timedelta(days=6)))
+
+    new_rows = sweep.ingest(grid_window(departure_start, return_start))
+
+    assert len(new_rows) == 49
+    assert sweep.coverage() == 1.0
+    assert sweep.window[0] == departure_start
+
+
+def test_window_before_range_start_keeps_its_year():
+    # A window opening a few days before the range must not jump a year ahead
+    sweep = DateGridSweep((date(2027, 1, 3), date(2027, 1, 9)), (date(2027, 1, 10), date(2027, 1, 16)))
+
+    sweep.ingest(grid_window(date(2026, 12, 30), date(2027, 1, 10)))
+
+    assert sweep.window[0] == date(2026, 12, 30)
+    assert sweep.window[1] == date(2027, 1, 5)
@@ -0,0 +1,106 @@
+# Condition-driven waits with per-stage timeouts and an overall latency budget for the scrapers
+import os
+import time
+
+
+# Seconds each scrape stage may wait for its readiness condition
+DEFAULT_STAGE_TIMEOUTS = {
+    "page_load": 15,
+    "trip_type": 10,
+    "city_entry": 10,
+    "date_selection": 10,
+    "search": 20,
+    "price_history": 15,
+    "date_grid": 20,
+    "one_way_paging": 10,
+    "date_grid_sweep": 10,
+    "cleanup": 5,
+}
+
+# Seconds a whole search may take before it is abandoned
+DEFAULT_TOTAL_BUDGET = float(os.environ.get("SCRAPE_LATENCY_BUDGET", 90))
+
+POLL_FREQUENCY = 0.1
+
+# Records the time of the last DOM mutation so dom_settled can tell when the page stops changing
+MUTATION_OBSERVER_JS = """
+if (!window.__scrapeObserver) {
+    window.__lastMutation = performance.now();
+    window.__scrapeObserver = new MutationObserver(function () {
+        window.__lastMutation = performance.now();
+    });
+    window.__scrapeObserver.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__lastMutation;
+"""
+
+
+class ScrapeTimeout(Exception):
+    def __init__(self, stage, timeout, budget_exhausted=False):
+        self.stage = stage
+        self.timeout = timeout
+        self.budget_exhausted = budget_exhausted
+        reason = "latency budget exhausted" if budget_exhausted else f"not ready after {timeout:.1f}s"
+        super().__init__(f"Stage '{stage}' timed out: {reason}")
+
+
+class ScrapeCancelled(Exception):
+    def __init__(self, stage):
+        self.stage = stage
+        super().__init__(f"Scrape cancelled during stage '{stage}'")
+
+
+class LatencyBudget:
+    def __init__(self, total_seconds=None, stage_timeouts=None, cancel_event=None):
+        self.total_seconds = DEFAULT_TOTAL_BUDGET if total_seconds is None else total_seconds
+        self.stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS)
+        if stage_timeouts:
+            self.stage_timeouts.update(stage_timeouts)
+        self.cancel_event = cancel_event
+        self.started = time.monotonic()
+
+    # Raise if whoever owns the scrape has asked for it to stop
+    def check_cancelled(self, stage):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ScrapeCancelled(stage)
+
+    def remaining(self):
+        return self.total_seconds - (time.monotonic() - self.started)
+
+    # Timeout for a stage: its own limit, capped by what is left of the overall budget
+    def timeout(self, stage):
+        self.check_cancelled(stage)
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise ScrapeTimeout(stage, 0, budget_exhausted=True)
+        return min(self.stage_timeouts.get(stage, 10), remaining)
+
+    # Wait until condition(driver) returns something truthy and return it
+    def until(self, driver, stage, condition):
+        # Selenium is imported here so the job queue and app can load this module without it
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        timeout = self.timeout(stage)
+
+        def check(d):
+            self.check_cancelled(stage)
+            return condition(d)
+
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(check)
+        except TimeoutException:
+            raise ScrapeTimeout(stage, timeout, budget_exhausted=self.remaining() <= 0)
+
+    # Wait until the DOM has had no mutations for `quiet` seconds
+    def dom_settled(self, driver, stage, quiet=0.3):
+        quiet_ms = quiet * 1000
+        return self.until(driver, stage, lambda d: d.execute_script(MUTATION_OBSERVER_JS) >= quiet_ms)
+
+
+# Condition that is true once the text signature returned by `script` differs from `previous`
+def content_changed(script, previous):
+    def condition(driver):
+        current = driver.execute_script(script)
+        return current if current != previous else False
+    return condition
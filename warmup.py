@@ -0,0 +1,63 @@
+# Timed loading of heavy dependencies, so a server can import them once before its first request
+import importlib
+import sys
+import threading
+import time
+
+from metrics import metrics
+
+# Modules the Flask worker needs to run a search: Selenium, BeautifulSoup, pandas/pyarrow and the pipeline itself
+BACKEND_MODULES = (
+    "selenium.webdriver",
+    "bs4",
+    "lxml",
+    "pandas",
+    "pyarrow.dataset",
+    "pipeline",
+)
+# Modules the dashboard needs once results are shown: charts and the Gemini SDK
+DASHBOARD_MODULES = (
+    "plotly.express",
+    "plotly.graph_objects",
+    "google.generativeai",
+)
+
+_import_seconds = {}
+_lock = threading.Lock()
+
+
+# Function to import each module once and record how long it took; a failed import is reported, not raised
+def prewarm(modules=BACKEND_MODULES):
+    timings = {}
+    for name in modules:
+        if name in sys.modules:
+            continue
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - started
+        metrics.observe(f"import:{name}", seconds, ok=error is None)
+        timings[name] = {"seconds": round(seconds, 4), "error": error}
+        print(f"Imported {name} in {seconds:.2f}s" + (f" ({error})" if error else ""))
+    with _lock:
+        _import_seconds.update(timings)
+    return timings
+
+
+# Modules loaded so far through prewarm() with their import times
+def import_report():
+    with _lock:
+        return dict(_import_seconds)
+
+
+if __name__ == "__main__":
+    # Report cold import times, slowest first: python warmup.py [module ...]
+    names = sys.argv[1:] or BACKEND_MODULES + DASHBOARD_MODULES
+    started = time.perf_counter()
+    report = prewarm(names)
+    for name, timing in sorted(report.items(), key=lambda item: -item[1]["seconds"]):
+        print(f"{timing['seconds']:8.3f}s  {name}" + (f"  ({timing['error']})" if timing["error"] else ""))
+    print(f"{time.perf_counter() - started:8.3f}s  total")